@@ -0,0 +1,94 @@
+"""
+Signup/login throughput against the configured database, with bcrypt taken out.
+
+bcrypt is deliberately slow and would hide any change in the SQL path, so the hash and
+verify functions are swapped for constant-time stand-ins. What is left is statement
+round trips, pool checkout and token generation.
+
+Run from the app directory:
+
+    python -m benchmarks.auth_benchmark --users 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+from fastapi import Response
+from starlette.requests import Request
+from sqlalchemy import text, delete
+from database.db import SessionLocal, engine
+from models.auth_models import User
+from schemas.auth_schemas import UserCreateSchema, UserLoginSchema
+import controllers.auth_controllers as auth_controllers
+from controllers.auth_controllers import AuthController
+
+
+FAKE_HASH = 'not-a-bcrypt-hash'
+
+
+def make_request() -> Request:
+    return Request({'type': 'http', 'method': 'POST', 'path': '/api/auth/login', 'headers': [], 'client': ('127.0.0.1', 0)})
+
+
+async def run_phase(name: str, jobs: list, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            async with SessionLocal() as db:
+                await job(db)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(job) for job in jobs))
+    elapsed = time.perf_counter() - started
+
+    print(f"{name:<8} {len(jobs):>7} ops  {elapsed:8.2f}s  {len(jobs) / elapsed:10.1f} ops/s")
+
+
+async def main(users: int, concurrency: int):
+    async def fake_hash(password):
+        return FAKE_HASH
+
+    async def fake_verify(plain, hashed):
+        return hashed == FAKE_HASH
+
+    auth_controllers.hash_password_async = fake_hash
+    auth_controllers.verify_password_async = fake_verify
+
+    run_id = uuid4().hex[:8]
+    emails = [f"bench-{run_id}-{i}@example.com" for i in range(users)]
+
+    signups = [
+        (lambda email: lambda db: AuthController.signup_func(UserCreateSchema(name='bench', email=email, password='x'), db, Response()))(email)
+        for email in emails
+    ]
+    logins = [
+        (lambda email: lambda db: AuthController.login_func(UserLoginSchema(email=email, password='x'), db, Response(), make_request()))(email)
+        for email in emails
+    ]
+
+    try:
+        await run_phase('signup', signups, concurrency)
+        await run_phase('login', logins, concurrency)
+
+        async with SessionLocal() as db:
+            plan = await db.execute(text("EXPLAIN SELECT id, password FROM users WHERE email = :email"), {'email': emails[0]})
+            print("\nlogin plan:")
+            for (line,) in plan.all():
+                print(f"  {line}")
+
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.email.like(f"bench-{run_id}-%")))
+            await db.commit()
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.users, args.concurrency))
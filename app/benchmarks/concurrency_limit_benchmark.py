@@ -0,0 +1,128 @@
+"""
+Goodput of the adaptive concurrency limiter against an overloaded, simulated database (no database).
+
+Requests arrive open-loop (Poisson) faster than a fixed-size pool can serve them: cheap
+note reads and heavy searches whose service time grows with the number of queries running
+at once. Clients give up after --client-timeout, but the server finishes the work anyway,
+as it would without statement timeouts. Compare with --no-limit.
+
+    python -m benchmarks.concurrency_limit_benchmark --rate 800 --duration 20
+    python -m benchmarks.concurrency_limit_benchmark --rate 800 --duration 20 --no-limit
+"""
+import argparse
+import asyncio
+import random
+import time
+from benchmarks.load_test import percentile
+from utils.concurrency_limiter import AdaptiveConcurrencyLimiter, ROUTE_PRIORITIES
+
+
+class SimulatedDatabase:
+    def __init__(self, pool_size: int, cores: int):
+        self.pool = asyncio.Semaphore(pool_size)
+        self.cores = cores
+        self.running = 0
+
+
+    async def query(self, service_time: float) -> float:
+        """Returns the time spent waiting for a pool connection."""
+        started = time.perf_counter()
+
+        async with self.pool:
+            pool_wait = time.perf_counter() - started
+            self.running += 1
+
+            try:
+                #past `cores` concurrent queries everything slows down proportionally
+                await asyncio.sleep(service_time * max(1.0, self.running / self.cores))
+            finally:
+                self.running -= 1
+
+        return pool_wait
+
+
+async def main(args):
+    limiter = AdaptiveConcurrencyLimiter()
+    limiter.enabled = not args.no_limit
+    database = SimulatedDatabase(args.pool_size, args.cores)
+    kinds = {
+        'get_note_route': args.get_ms / 1000,
+        'search_notes_route': args.search_ms / 1000,
+    }
+    results = {route: {'ok': [], 'late': 0, 'shed': 0} for route in kinds}
+    limits = []
+    tasks = []
+
+    async def request(route: str):
+        started = time.perf_counter()
+        slot = None
+
+        if limiter.enabled:
+            slot = limiter.try_acquire(ROUTE_PRIORITIES.get(route, 'normal'))
+
+            if slot is None:
+                results[route]['shed'] += 1
+                return
+
+        try:
+            pool_wait = await database.query(kinds[route])
+
+            if slot is not None:
+                slot.pool_wait = pool_wait
+
+        finally:
+            if slot is not None:
+                limiter.release(slot)
+
+        elapsed = time.perf_counter() - started
+
+        if elapsed > args.client_timeout:
+            results[route]['late'] += 1
+        else:
+            results[route]['ok'].append(elapsed)
+
+    async def sample_limit():
+        while True:
+            limits.append(limiter.limit)
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_limit())
+    deadline = time.perf_counter() + args.duration
+
+    while time.perf_counter() < deadline:
+        route = 'search_notes_route' if random.random() < args.search_share else 'get_note_route'
+        tasks.append(asyncio.create_task(request(route)))
+        await asyncio.sleep(random.expovariate(args.rate))
+
+    await asyncio.gather(*tasks)
+    sampler.cancel()
+
+    print(f"limiter: {'on' if limiter.enabled else 'off'}  {len(tasks)} requests over {args.duration}s")
+
+    for route, result in results.items():
+        total = len(result['ok']) + result['late'] + result['shed']
+        ok = result['ok']
+
+        print(
+            f"{route:<20} ok {len(ok) / max(total, 1):6.1%}  late {result['late'] / max(total, 1):6.1%}  "
+            f"shed {result['shed'] / max(total, 1):6.1%}  p50 {percentile(ok, 50) * 1000:7.1f}ms  p95 {percentile(ok, 95) * 1000:7.1f}ms"
+        )
+
+    if limiter.enabled:
+        print(f"limit: final {limiter.limit:.1f}  min {min(limits):.1f}  max {max(limits):.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rate', type=float, default=800, help='arrivals per second')
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--search-share', type=float, default=0.2)
+    parser.add_argument('--get-ms', type=float, default=3)
+    parser.add_argument('--search-ms', type=float, default=60)
+    parser.add_argument('--pool-size', type=int, default=15)
+    parser.add_argument('--cores', type=int, default=4, help='concurrent queries before the database slows down')
+    parser.add_argument('--client-timeout', type=float, default=2.0)
+    parser.add_argument('--no-limit', action='store_true')
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
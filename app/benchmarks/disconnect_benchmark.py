@@ -0,0 +1,152 @@
+"""
+How long an abandoned search keeps running in Postgres after its client has gone.
+
+Creates a user with --notes large notes, then issues `GET /api/notes?search=...` requests
+(a content ILIKE that matches nothing, so every one scans everything) straight through the
+ASGI app with a client that disconnects after --client-timeout. For each request it polls
+pg_stat_activity until the query is gone and reports how long it outlived the client.
+Set CANCEL_ON_DISCONNECT=false to compare with queries that are left to finish:
+
+    python -m benchmarks.disconnect_benchmark --notes 20000 --size 20000
+    CANCEL_ON_DISCONNECT=false python -m benchmarks.disconnect_benchmark --notes 20000 --size 20000
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+import httpx
+from sqlalchemy import select, text, delete
+from benchmarks.load_test import setup_users, percentile
+
+
+async def abandoned_request(app, path: str, query: str, headers: dict, client_timeout: float, state: dict):
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        await asyncio.sleep(client_timeout)
+        state['disconnected_at'] = time.perf_counter()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            state['status'] = message['status']
+
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': query.encode(),
+        'headers': [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+        'client': ('127.0.0.1', 12345),
+        'server': ('bench', 80),
+    }
+
+    await app(scope, receive, send)
+
+
+async def main(args):
+    #the rate limiter singleton schedules its cleanup task when imported, which needs a running loop;
+    #startup tasks run in the lifespan hook, which ASGITransport never calls
+    from server import app
+    from database.db import SessionLocal, engine
+    from models.auth_models import User
+    from dependencies.rate_limit import rate_limit_20_per_minute
+    from dependencies.concurrency_limit import concurrency_limit
+    from utils.query_budget import CANCEL_ON_DISCONNECT, statement_timeout_for
+
+    async def no_rate_limit():
+        return
+
+    app.dependency_overrides[rate_limit_20_per_minute] = no_rate_limit
+    app.dependency_overrides[concurrency_limit] = lambda: None
+    run_id = uuid4().hex[:8]
+    transport = httpx.ASGITransport(app=app, client=('127.0.0.1', 12345))
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            [user] = await setup_users(client, f'disc{run_id}', 1, 0, 1)
+
+        async with SessionLocal() as db:
+            user_id = (await db.execute(select(User.id).where(User.email == user.email))).scalar_one()
+
+            await db.execute(text(
+                "INSERT INTO notes (id, user_id, is_deleted, title, content) "
+                "SELECT gen_random_uuid(), :user_id, false, 'bulk ' || g, repeat(md5(g::text), :repeat) "
+                "FROM generate_series(1, :notes) g"
+            ), {'user_id': user_id, 'notes': args.notes, 'repeat': max(1, args.size // 32)})
+            await db.commit()
+
+        outlived = []
+        statuses = {}
+
+        for _ in range(args.requests):
+            #a fresh search term every time, so the result cache never answers
+            state = {'status': None, 'disconnected_at': None}
+            request = asyncio.create_task(abandoned_request(
+                app, '/api/notes', f'search={uuid4().hex}', user.headers, args.client_timeout, state
+            ))
+
+            async with SessionLocal() as monitor:
+                #wait for the client to leave, then for its search to disappear from pg_stat_activity
+                while not request.done() and state['disconnected_at'] is None:
+                    await asyncio.sleep(0.005)
+
+                while True:
+                    running = (await monitor.execute(text(
+                        "SELECT count(*) FROM pg_stat_activity WHERE state = 'active' AND pid <> pg_backend_pid() AND query LIKE '%ILIKE%'"
+                    ))).scalar_one()
+                    await monitor.rollback()
+
+                    if not running:
+                        break
+
+                    await asyncio.sleep(0.005)
+
+            gone = time.perf_counter()
+            await request
+
+            if state['disconnected_at'] is not None:
+                outlived.append(max(0.0, gone - state['disconnected_at']))
+
+            statuses[state['status']] = statuses.get(state['status'], 0) + 1
+
+        print(f"cancel on disconnect: {CANCEL_ON_DISCONNECT}  statement_timeout: {statement_timeout_for('list_notes_route')}ms  statuses: {statuses}")
+
+        if outlived:
+            print(
+                f"query outlived its client: p50 {percentile(outlived, 50) * 1000:.1f}ms  "
+                f"p95 {percentile(outlived, 95) * 1000:.1f}ms  max {max(outlived) * 1000:.1f}ms  ({len(outlived)} abandoned)"
+            )
+        else:
+            print("every search finished before the client gave up; raise --size or lower --client-timeout")
+
+    finally:
+        app.dependency_overrides.clear()
+
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.email.like(f'load-disc{run_id}-%')))
+            await db.commit()
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--notes', type=int, default=20000)
+    parser.add_argument('--size', type=int, default=20000, help='content bytes per note')
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--client-timeout', type=float, default=0.2)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
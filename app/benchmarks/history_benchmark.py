@@ -0,0 +1,115 @@
+"""
+Write overhead, storage and restore latency of note revision history. Edits one large note
+repeatedly with small changes, with history off and on, then rebuilds random versions.
+
+    python -m benchmarks.history_benchmark --edits 500 --size 200000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from uuid import uuid4
+from sqlalchemy import delete, func, select
+from database.db import SessionLocal, engine
+from models.auth_models import User
+from models.notes_models import Note
+from models.note_revision_models import NoteRevision
+from schemas.note_schemas import NoteUpdateSchema
+from controllers.notes_controllers import NoteController
+from utils.note_history import note_history
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def edit(lines):
+    #a typical edit: rewrite one line and sometimes append a new one
+    lines[random.randrange(len(lines))] = f'edited line {uuid4().hex}\n'
+
+    if random.random() < 0.3:
+        lines.append(f'appended line {uuid4().hex}\n')
+
+
+async def run_edits(user_id, note_id, lines, edits: int):
+    timings = []
+    raw_bytes = 0
+
+    for _ in range(edits):
+        edit(lines)
+        content = ''.join(lines)
+        raw_bytes += len(content.encode())
+
+        async with SessionLocal() as db:
+            started = time.perf_counter()
+            await NoteController.update_note_func(note_id, NoteUpdateSchema(content=content), user_id, db)
+            timings.append(time.perf_counter() - started)
+
+    return timings, raw_bytes
+
+
+def report(name, timings):
+    print(f"{name:<14} p50 {percentile(timings, 0.5) * 1000:7.2f}ms  p95 {percentile(timings, 0.95) * 1000:7.2f}ms  p99 {percentile(timings, 0.99) * 1000:7.2f}ms")
+
+
+async def main(edits: int, size: int, restores: int):
+    user_id = uuid4()
+    lines = [f'line {i} {uuid4().hex}\n' for i in range(max(1, size // 40))]
+
+    async with SessionLocal() as db:
+        db.add(User(id=user_id, name='bench', email=f'history-{user_id.hex[:8]}@example.com', password='x'))
+        await db.flush()
+
+        notes = [Note(user_id=user_id, title='history bench', content=''.join(lines)) for _ in range(2)]
+        db.add_all(notes)
+        await db.commit()
+
+        plain_id, history_id = notes[0].id, notes[1].id
+
+    try:
+        note_history.enabled = False
+        plain, _ = await run_edits(user_id, plain_id, list(lines), edits)
+
+        note_history.enabled = True
+        tracked, raw_bytes = await run_edits(user_id, history_id, list(lines), edits)
+
+        report('history off', plain)
+        report('history on', tracked)
+
+        async with SessionLocal() as db:
+            stored, count, snapshots = (await db.execute(
+                select(func.sum(func.length(NoteRevision.data)), func.count(), func.count().filter(NoteRevision.is_snapshot == True))
+                .where(NoteRevision.note_id == history_id)
+            )).one()
+
+            versions = (await db.execute(select(NoteRevision.version).where(NoteRevision.note_id == history_id))).scalars().all()
+
+            rebuilds = []
+
+            for version in random.choices(versions, k=restores):
+                started = time.perf_counter()
+                await note_history.reconstruct(db, history_id, version)
+                rebuilds.append(time.perf_counter() - started)
+
+        print(f"{count} revisions ({snapshots} snapshots) stored in {stored / 1024:.0f} KiB vs {raw_bytes / 1024:.0f} KiB of raw versions ({raw_bytes / max(stored, 1):.1f}x)")
+        report('reconstruct', rebuilds)
+        print(f"mean reconstruct {statistics.mean(rebuilds) * 1000:.2f}ms")
+
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--edits', type=int, default=500, help='updates per note')
+    parser.add_argument('--size', type=int, default=200000, help='approximate note size in characters')
+    parser.add_argument('--restores', type=int, default=200, help='random versions to rebuild')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.edits, args.size, args.restores))
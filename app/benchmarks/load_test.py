@@ -0,0 +1,327 @@
+"""
+End-to-end load test for the notes API.
+
+Boots `app` from server.py in-process (httpx ASGI transport, so no network noise) against
+the database in POSTGRES_DATABASE_URL and drives a weighted mix of auth and note
+operations at a fixed concurrency. Rate limiting and the concurrency limiter are switched off
+for the run.
+
+Reports p50/p95/p99 latency and throughput per operation, overall RPS, and DB statements
+per request (measured in a sequential calibration pass so concurrent requests can't
+blur the attribution). Results are written as JSON so runs can be diffed between commits:
+
+    python -m benchmarks.load_test --users 20 --requests 5000 --concurrency 50
+    python -m benchmarks.load_test --compare benchmarks/results/<old>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+from uuid import uuid4
+import httpx
+from sqlalchemy import event, delete
+
+
+# operation -> weight in the mixed phase
+MIX = {
+    'get': 30,
+    'list_shallow': 20,
+    'list_deep': 5,
+    'search': 10,
+    'create': 15,
+    'update': 10,
+    'delete': 5,
+    'login': 5,
+}
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, 'before_cursor_execute', self._on_execute)
+
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+class VirtualUser:
+    def __init__(self, email: str, password: str):
+        self.email = email
+        self.password = password
+        self.token = None
+        self.note_ids: List[str] = []
+
+
+    @property
+    def headers(self) -> dict:
+        return {'Authorization': f'Bearer {self.token}'}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return 'local'
+
+
+def build_operations(client: httpx.AsyncClient, notes_per_user: int) -> Dict[str, Callable]:
+    deep_page = max(1, notes_per_user // 10)
+
+    async def op_get(user: VirtualUser):
+        note_id = random.choice(user.note_ids) if user.note_ids else uuid4()
+        return await client.get(f'/api/notes/{note_id}', headers=user.headers)
+
+    async def op_list_shallow(user: VirtualUser):
+        return await client.get('/api/notes', params={'page': 1, 'page_size': 10}, headers=user.headers)
+
+    async def op_list_deep(user: VirtualUser):
+        return await client.get('/api/notes', params={'page': deep_page, 'page_size': 10}, headers=user.headers)
+
+    async def op_search(user: VirtualUser):
+        return await client.get('/api/notes/search', params={'title': f'note {random.randint(0, 9)}'}, headers=user.headers)
+
+    async def op_create(user: VirtualUser):
+        res = await client.post('/api/notes', json={'title': f'note {uuid4().hex[:6]}', 'content': 'x' * random.randint(100, 4000)}, headers=user.headers)
+
+        if res.status_code == 201:
+            user.note_ids.append(res.json()['id'])
+
+        return res
+
+    async def op_update(user: VirtualUser):
+        note_id = random.choice(user.note_ids) if user.note_ids else uuid4()
+        return await client.put(f'/api/notes/{note_id}', json={'content': 'y' * random.randint(100, 4000)}, headers=user.headers)
+
+    async def op_delete(user: VirtualUser):
+        if len(user.note_ids) <= 1:
+            return await op_get(user)
+
+        note_id = user.note_ids.pop(random.randrange(len(user.note_ids)))
+        return await client.delete(f'/api/notes/{note_id}', headers=user.headers)
+
+    async def op_login(user: VirtualUser):
+        res = await client.post('/api/auth/login', json={'email': user.email, 'password': user.password})
+
+        if res.status_code == 200:
+            user.token = res.json()
+
+        return res
+
+    return {
+        'get': op_get,
+        'list_shallow': op_list_shallow,
+        'list_deep': op_list_deep,
+        'search': op_search,
+        'create': op_create,
+        'update': op_update,
+        'delete': op_delete,
+        'login': op_login,
+    }
+
+
+async def setup_users(client: httpx.AsyncClient, run_id: str, users: int, notes_per_user: int, concurrency: int) -> List[VirtualUser]:
+    semaphore = asyncio.Semaphore(concurrency)
+    virtual_users = [VirtualUser(f'load-{run_id}-{i}@example.com', 'load-test-password') for i in range(users)]
+
+    async def setup(user: VirtualUser):
+        async with semaphore:
+            res = await client.post('/api/auth/signup', json={'name': 'load', 'email': user.email, 'password': user.password})
+            res.raise_for_status()
+            user.token = res.json()
+
+            for i in range(notes_per_user):
+                res = await client.post('/api/notes', json={'title': f'note {i}', 'content': 'seed ' * 50}, headers=user.headers)
+                res.raise_for_status()
+                user.note_ids.append(res.json()['id'])
+
+    await asyncio.gather(*(setup(user) for user in virtual_users))
+    return virtual_users
+
+
+async def calibrate(operations: Dict[str, Callable], users: List[VirtualUser], counter: StatementCounter, rounds: int = 10) -> Dict[str, float]:
+    statements = {}
+
+    for name, operation in operations.items():
+        before = counter.count
+
+        for _ in range(rounds):
+            await operation(random.choice(users))
+
+        statements[name] = (counter.count - before) / rounds
+
+    return statements
+
+
+async def run_mix(operations: Dict[str, Callable], users: List[VirtualUser], total: int, concurrency: int):
+    names = list(MIX)
+    weights = [MIX[name] for name in names]
+    plan = random.choices(names, weights=weights, k=total)
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    queue: asyncio.Queue = asyncio.Queue()
+
+    for name in plan:
+        queue.put_nowait(name)
+
+    async def worker():
+        while not queue.empty():
+            name = queue.get_nowait()
+            started = time.perf_counter()
+            res = await operations[name](random.choice(users))
+            latencies[name].append((time.perf_counter() - started) * 1000)
+            statuses[name][res.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return latencies, statuses, elapsed
+
+
+def summarize(latencies, statuses, statements, elapsed, args) -> dict:
+    all_samples = [sample for samples in latencies.values() for sample in samples]
+
+    operations = {}
+    for name, samples in sorted(latencies.items()):
+        operations[name] = {
+            'count': len(samples),
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'statements_per_request': statements.get(name),
+            'status_codes': dict(statuses[name]),
+        }
+
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {'users': args.users, 'notes_per_user': args.notes_per_user, 'requests': args.requests, 'concurrency': args.concurrency},
+        'total': {
+            'requests': len(all_samples),
+            'elapsed_s': round(elapsed, 3),
+            'rps': round(len(all_samples) / elapsed, 1),
+            'p50_ms': round(percentile(all_samples, 50), 3),
+            'p95_ms': round(percentile(all_samples, 95), 3),
+            'p99_ms': round(percentile(all_samples, 99), 3),
+        },
+        'operations': operations,
+    }
+
+
+def print_report(report: dict):
+    print(f"{'operation':<14}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'stmts':>8}")
+
+    for name, op in report['operations'].items():
+        print(f"{name:<14}{op['count']:>8}{op['p50_ms']:>10.2f}{op['p95_ms']:>10.2f}{op['p99_ms']:>10.2f}{op['statements_per_request'] or 0:>8.1f}")
+
+    total = report['total']
+    print(f"\n{total['requests']} requests in {total['elapsed_s']}s -> {total['rps']} rps (p50 {total['p50_ms']}ms, p95 {total['p95_ms']}ms, p99 {total['p99_ms']}ms)")
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{old['revision']} -> {new['revision']}")
+    print(f"{'operation':<14}{'p95 old':>10}{'p95 new':>10}{'change':>9}{'stmts':>12}")
+
+    for name, op in new['operations'].items():
+        before = old['operations'].get(name)
+        if not before:
+            continue
+
+        change = (op['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+        stmts = f"{before['statements_per_request'] or 0:.1f}->{op['statements_per_request'] or 0:.1f}"
+        print(f"{name:<14}{before['p95_ms']:>10.2f}{op['p95_ms']:>10.2f}{change:>8.1f}%{stmts:>12}")
+
+    print(f"rps: {old['total']['rps']} -> {new['total']['rps']}")
+
+
+async def main(args):
+    #the rate limiter singleton schedules its cleanup task when imported, which needs a running loop;
+    #startup tasks run in the lifespan hook, which ASGITransport never calls
+    from server import app
+    from database.db import SessionLocal, engine
+    from models.auth_models import User
+    from dependencies.rate_limit import rate_limit_20_per_minute
+    from dependencies.concurrency_limit import concurrency_limit
+    from utils.loop_watchdog import loop_watchdog
+
+    app.dependency_overrides[rate_limit_20_per_minute] = lambda: None
+    #with the limiter on, --concurrency above its limit would measure 503s instead of the routes
+    app.dependency_overrides[concurrency_limit] = lambda: None
+    counter = StatementCounter(engine)
+    run_id = uuid4().hex[:8]
+
+    transport = httpx.ASGITransport(app=app, client=('127.0.0.1', 12345))
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            users = await setup_users(client, run_id, args.users, args.notes_per_user, args.concurrency)
+            operations = build_operations(client, args.notes_per_user)
+
+            statements = await calibrate(operations, users, counter)
+
+            if args.loop_budget_ms:
+                #fails the run with LoopBlockedError if any request blocks the loop past the budget
+                async with loop_watchdog.block_budget(args.loop_budget_ms):
+                    latencies, statuses, elapsed = await run_mix(operations, users, args.requests, args.concurrency)
+            else:
+                latencies, statuses, elapsed = await run_mix(operations, users, args.requests, args.concurrency)
+
+        report = summarize(latencies, statuses, statements, elapsed, args)
+        print_report(report)
+
+        os.makedirs(args.output_dir, exist_ok=True)
+        path = os.path.join(args.output_dir, f"{report['revision']}-{run_id}.json")
+
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print(f"\nresults written to {path}")
+        return path
+
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.email.like(f'load-{run_id}-%')))
+            await db.commit()
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--notes-per-user', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--output-dir', default=os.path.join('benchmarks', 'results'))
+    parser.add_argument('--loop-budget-ms', type=float, help='fail if the event loop is blocked longer than this during the run')
+    parser.add_argument('--compare', metavar='OLD_RESULTS', help='diff this run against an earlier results file')
+    args = parser.parse_args()
+
+    path = asyncio.run(main(args))
+
+    if args.compare:
+        print()
+        compare(args.compare, path)
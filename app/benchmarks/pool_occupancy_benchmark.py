@@ -0,0 +1,165 @@
+"""
+Connection pool occupancy under a mix of rejected and accepted note requests.
+
+Drives the app in-process (like load_test) with GET /api/notes/{id} requests, a share of
+which are rejected with 401 (bad token) or 429 (rate limited). Samples the pool's checked-out
+connections and times every checkout-to-checkin. `--eager` replays the old behaviour for
+comparison: a connection checked out as soon as the session dependency runs and held until
+the dependency is torn down after the response.
+
+    python -m benchmarks.pool_occupancy_benchmark --requests 5000 --reject 0.5
+    python -m benchmarks.pool_occupancy_benchmark --requests 5000 --reject 0.5 --eager
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from uuid import uuid4
+import httpx
+from fastapi import HTTPException, Request
+from sqlalchemy import event, delete
+from benchmarks.load_test import setup_users, percentile
+
+
+class PoolProbe:
+    def __init__(self, engine):
+        self.pool = engine.sync_engine.pool
+        self.checked_out_at = {}
+        self.holds = []
+        self.samples = []
+        event.listen(self.pool, 'checkout', self._on_checkout)
+        event.listen(self.pool, 'checkin', self._on_checkin)
+
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checked_out_at[id(connection_record)] = time.perf_counter()
+
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        started = self.checked_out_at.pop(id(connection_record), None)
+
+        if started is not None:
+            self.holds.append(time.perf_counter() - started)
+
+
+    async def sample(self, interval: float):
+        while True:
+            self.samples.append(self.pool.checkedout())
+            await asyncio.sleep(interval)
+
+
+async def main(args):
+    #the rate limiter singleton schedules its cleanup task when imported, which needs a running loop;
+    #startup tasks run in the lifespan hook, which ASGITransport never calls
+    from server import app
+    from database.db import SessionLocal, engine, connect_db
+    from models.auth_models import User
+    from dependencies.rate_limit import rate_limit_20_per_minute
+    from dependencies.concurrency_limit import concurrency_limit
+
+    sessions_opened = 0
+
+    async def rate_limit(request: Request):
+        if request.headers.get('X-Bench-Limited'):
+            raise HTTPException(status_code=429, detail="Rate limit exceeded")
+
+    async def eager_connect_db():
+        nonlocal sessions_opened
+        sessions_opened += 1
+
+        async with SessionLocal() as session:
+            await session.connection()
+            close = session.close
+
+            #keep the connection until this dependency exits, as before early release
+            async def deferred_close():
+                pass
+
+            session.close = deferred_close
+
+            try:
+                yield session
+            finally:
+                await close()
+
+    async def counted_connect_db():
+        nonlocal sessions_opened
+        sessions_opened += 1
+
+        async for session in connect_db():
+            yield session
+
+    app.dependency_overrides[rate_limit_20_per_minute] = rate_limit
+    app.dependency_overrides[concurrency_limit] = lambda: None
+    app.dependency_overrides[connect_db] = eager_connect_db if args.eager else counted_connect_db
+
+    run_id = uuid4().hex[:8]
+    transport = httpx.ASGITransport(app=app, client=('127.0.0.1', 12345))
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            users = await setup_users(client, f'pool{run_id}', args.users, args.notes_per_user, args.concurrency)
+
+            probe = PoolProbe(engine)
+            sessions_opened = 0
+            statuses = {}
+            latencies = []
+            queue: asyncio.Queue = asyncio.Queue()
+
+            for _ in range(args.requests):
+                roll = random.random()
+                kind = 'ok' if roll >= args.reject else ('unauthorized' if roll < args.reject / 2 else 'limited')
+                queue.put_nowait(kind)
+
+            async def worker():
+                while not queue.empty():
+                    kind = queue.get_nowait()
+                    user = random.choice(users)
+                    headers = dict(user.headers)
+
+                    if kind == 'unauthorized':
+                        headers['Authorization'] = 'Bearer invalid'
+                    elif kind == 'limited':
+                        headers['X-Bench-Limited'] = '1'
+
+                    started = time.perf_counter()
+                    res = await client.get(f'/api/notes/{random.choice(user.note_ids)}', headers=headers)
+                    latencies.append(time.perf_counter() - started)
+                    statuses[res.status_code] = statuses.get(res.status_code, 0) + 1
+
+            sampler = asyncio.create_task(probe.sample(args.sample_ms / 1000))
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+            sampler.cancel()
+
+        mode = 'eager' if args.eager else 'lazy'
+        print(f"mode: {mode}  {args.requests} requests in {elapsed:.1f}s  statuses: {dict(sorted(statuses.items()))}")
+        print(f"sessions opened: {sessions_opened}  connection checkouts: {len(probe.holds)}")
+        print(f"pool checked out: mean {statistics.mean(probe.samples):.2f}  p95 {percentile(probe.samples, 95):.0f}  max {max(probe.samples)}")
+        print(f"connection hold: p50 {percentile(probe.holds, 50) * 1000:.2f}ms  p95 {percentile(probe.holds, 95) * 1000:.2f}ms  total {sum(probe.holds):.2f} connection-seconds")
+        print(f"request latency: p50 {percentile(latencies, 50) * 1000:.2f}ms  p95 {percentile(latencies, 95) * 1000:.2f}ms")
+
+    finally:
+        app.dependency_overrides.clear()
+
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.email.like(f'load-pool{run_id}-%')))
+            await db.commit()
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--notes-per-user', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--reject', type=float, default=0.5, help='share of requests rejected (half 401, half 429)')
+    parser.add_argument('--sample-ms', type=float, default=1.0, help='pool sampling interval')
+    parser.add_argument('--eager', action='store_true', help='check out at dependency time and hold until teardown (old behaviour)')
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,209 @@
+"""
+Query-plan regression check for every statement NoteController issues. This is the repo's
+query-plan test: there is no pytest suite for it, so gate merges on its exit code.
+
+Runs each NoteController method for a heavy seeded user (see seed_dataset.py), captures
+the SQL it sends, and re-runs the statements in order under EXPLAIN (ANALYZE, BUFFERS,
+FORMAT JSON) inside one transaction that is rolled back. The check fails (exit code 1) if a
+statement errors, or if any plan scans notes, users or a rollup table sequentially or touches
+more shared buffers than its budget.
+
+Statements that have to read the whole of a heavy user's notes (substring search, COUNT(*)
+over the match) have no fixed budget; they are checked against a recorded baseline instead.
+Record one on a known-good commit, then compare later runs against it:
+
+    python -m benchmarks.query_plans --record-baseline benchmarks/results/plans-baseline.json
+    python -m benchmarks.query_plans --baseline benchmarks/results/plans-baseline.json
+    python -m benchmarks.query_plans --buffer-budget 2000
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, timedelta
+from sqlalchemy import event, select, delete, func
+from sqlalchemy.exc import DBAPIError
+from database.db import SessionLocal, engine
+from models.auth_models import User
+from models.notes_models import Note
+from schemas.note_schemas import NoteCreateSchema, NoteUpdateSchema, NoteSearchSchema
+from controllers.notes_controllers import NoteController
+
+
+WATCHED_TABLES = {'notes', 'users', 'note_tag_counts', 'note_daily_stats'}
+
+#headroom over a recorded baseline before a statement counts as regressed
+BASELINE_TOLERANCE = 0.2
+
+
+def reads_all_user_notes(statement: str) -> bool:
+    """Substring matches and totals scan every matching note of the user by design; only a baseline can tell a regression."""
+    lowered = statement.lower()
+    return ' ilike ' in lowered or 'count(' in lowered
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.label = None
+        self.statements = []
+        event.listen(engine.sync_engine, 'before_cursor_execute', self._on_execute)
+
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label and not executemany:
+            self.statements.append((self.label, statement, parameters))
+
+
+async def capture_statements(user_id) -> list:
+    recorder = StatementRecorder()
+    today = date.today()
+
+    async def run(label, call):
+        recorder.label = label
+
+        async with SessionLocal() as db:
+            result = await call(db)
+
+        recorder.label = None
+        return result
+
+    created = await run('create_note', lambda db: NoteController.create_note_func(NoteCreateSchema(title='plan check', content='plan check'), user_id, db))
+
+    await run('get_note', lambda db: NoteController.get_note_func(created.id, user_id, db))
+    await run('list_notes', lambda db: NoteController.list_notes_func(user_id, db, 1, 10, None))
+    await run('list_notes_deep', lambda db: NoteController.list_notes_func(user_id, db, 500, 10, None))
+    await run('list_notes_search', lambda db: NoteController.list_notes_func(user_id, db, 1, 10, 'meeting'))
+    await run('search_title', lambda db: NoteController.search_notes_func(user_id, NoteSearchSchema(title='idea'), db))
+    await run('search_dates', lambda db: NoteController.search_notes_func(user_id, NoteSearchSchema(created_after=today - timedelta(days=30), created_before=today), db))
+    await run('list_notes_tag', lambda db: NoteController.list_notes_func(user_id, db, 1, 10, None, ['work'], 'all'))
+    await run('list_notes_rare_tags', lambda db: NoteController.list_notes_func(user_id, db, 1, 10, None, ['finance', 'archive'], 'any'))
+    await run('search_tags', lambda db: NoteController.search_notes_func(user_id, NoteSearchSchema(tags=['urgent', 'work']), db))
+    await run('tag_facets', lambda db: NoteController.tag_facets_func(user_id, db))
+    await run('stats_year', lambda db: NoteController.stats_func(user_id, today - timedelta(days=365), today, db))
+    await run('update_note', lambda db: NoteController.update_note_func(created.id, NoteUpdateSchema(content='updated'), user_id, db))
+    await run('soft_delete_note', lambda db: NoteController.soft_delete_note_func(created.id, user_id, db))
+
+    #removed before the replay, which creates it again inside its own transaction
+    async with SessionLocal() as db:
+        await db.execute(delete(Note).where(Note.id == created.id))
+        await db.commit()
+
+    event.remove(engine.sync_engine, 'before_cursor_execute', recorder._on_execute)
+    return recorder.statements
+
+
+def walk(plan: dict):
+    yield plan
+
+    for child in plan.get('Plans', []):
+        yield from walk(child)
+
+
+def check_plan(plan: dict, budget) -> list:
+    problems = []
+
+    for node in walk(plan):
+        if node.get('Node Type') == 'Seq Scan' and node.get('Relation Name') in WATCHED_TABLES:
+            problems.append(f"sequential scan on {node['Relation Name']}")
+
+    buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+
+    if budget is not None and buffers > budget:
+        problems.append(f"{buffers} shared buffers (budget {budget})")
+
+    return problems
+
+
+def budget_for(key: str, statement: str, buffer_budget: int, baseline) -> int:
+    """Baseline plus tolerance when one covers the statement, the fixed budget otherwise; None means unchecked."""
+    if baseline is not None and key in baseline:
+        return int(baseline[key] * (1 + BASELINE_TOLERANCE)) + 10
+
+    return None if reads_all_user_notes(statement) else buffer_budget
+
+
+async def main(buffer_budget: int, email: str, baseline_path: str, record_path: str) -> int:
+    async with SessionLocal() as db:
+        user_id = (await db.execute(select(User.id).where(User.email == email))).scalar_one_or_none()
+
+        if user_id is None:
+            print(f"{email} not found, run benchmarks.seed_dataset first")
+            return 1
+
+        note_count = (await db.execute(select(func.count()).select_from(Note).where(Note.user_id == user_id))).scalar_one()
+        print(f"checking plans for {email} ({note_count} notes)\n")
+
+    statements = await capture_statements(user_id)
+    failures = 0
+    baseline = None
+    recorded = {}
+    seen_labels = {}
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    async with engine.connect() as conn:
+        #the statements are replayed in capture order inside one transaction that is rolled back, so
+        #each sees the rows the earlier ones wrote (the revision INSERTs need the note created first)
+        transaction = await conn.begin()
+
+        for label, statement, parameters in statements:
+            savepoint = await conn.begin_nested()
+
+            try:
+                result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+                raw = result.scalar_one()
+                await savepoint.commit()
+
+            except DBAPIError as e:
+                await savepoint.rollback()
+                failures += 1
+                print(f"{'FAIL':<5}{label:<20}{type(e.orig).__name__}: {str(e.orig).splitlines()[0]}")
+                print(f"       {' '.join(statement.split())}")
+                continue
+
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]['Plan']
+
+            #a method can issue several statements; they are matched to the baseline by position
+            index = seen_labels.get(label, 0)
+            seen_labels[label] = index + 1
+            key = f'{label}#{index}'
+
+            buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+            recorded[key] = buffers
+            problems = check_plan(plan, budget_for(key, statement, buffer_budget, baseline))
+
+            status = 'FAIL' if problems else 'ok'
+            print(f"{status:<5}{label:<20}{plan['Node Type']:<22}{buffers:>8} buffers {plan['Actual Total Time']:>10.2f}ms")
+
+            for problem in problems:
+                print(f"       {problem}")
+
+            if problems:
+                failures += 1
+                print(f"       {' '.join(statement.split())}")
+
+        await transaction.rollback()
+
+    await engine.dispose()
+
+    if record_path:
+        with open(record_path, 'w') as f:
+            json.dump(recorded, f, indent=2, sort_keys=True)
+
+        print(f"\nbaseline written to {record_path}")
+
+    print(f"\n{len(statements)} statements, {failures} regressions")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--buffer-budget', type=int, default=2000, help='max shared buffers touched per point-lookup statement')
+    parser.add_argument('--baseline', help='JSON written by --record-baseline; every statement it covers must stay within 20%% of it')
+    parser.add_argument('--record-baseline', help='write shared buffers per statement to this file')
+    parser.add_argument('--email', default='seed-0@example.com', help='user to run the statements as (default: heaviest seeded user)')
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args.buffer_budget, args.email, args.baseline, args.record_baseline)))
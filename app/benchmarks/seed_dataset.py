@@ -0,0 +1,143 @@
+"""
+Bulk-loads a production-sized synthetic dataset with COPY.
+
+Notes per user follow a power law, so a handful of heavy users own a large share of the
+table while most users have a few notes. Content lengths are skewed the same way (mostly
+short, some very long) and a fraction of notes is soft deleted. Timestamps are spread
+over the last few years so date-range searches have something to select, and tags are
+drawn from a skewed vocabulary so tag filters see both common and rare tags.
+
+    python -m benchmarks.seed_dataset --users 100000 --notes 5000000
+
+Seeded users have emails `seed-<n>@example.com`; user 0 is always the heaviest.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import asyncpg
+from dotenv import load_dotenv # type: ignore
+from utils.hash_services import hash_password_func
+
+
+load_dotenv()
+
+BATCH_SIZE = 50000
+TAGS = ['work', 'personal', 'urgent', 'later', 'reading', 'health', 'finance', 'family', 'ideas', 'archive']
+WORDS = ['meeting', 'todo', 'idea', 'draft', 'groceries', 'project', 'review', 'journal', 'plan', 'recipe', 'book', 'travel', 'budget', 'notes', 'call']
+
+
+def raw_database_url() -> str:
+    #asyncpg wants a plain postgres url, not the SQLAlchemy dialect form
+    return os.getenv('POSTGRES_DATABASE_URL').replace('postgresql+asyncpg://', 'postgresql://')
+
+
+def notes_per_user(users: int, notes: int, skew: float) -> list:
+    weights = [1 / (rank + 1) ** skew for rank in range(users)]
+    scale = notes / sum(weights)
+    return [max(0, int(weight * scale)) for weight in weights]
+
+
+def random_tags() -> list:
+    #earlier tags in TAGS are much more common than later ones
+    count = random.choices([0, 1, 2, 3], weights=[30, 40, 20, 10])[0]
+    return sorted(set(random.choices(TAGS, weights=[1 / (rank + 1) for rank in range(len(TAGS))], k=count)))
+
+
+def random_content() -> str:
+    roll = random.random()
+
+    if roll < 0.6:
+        length = random.randint(20, 400)
+    elif roll < 0.95:
+        length = random.randint(400, 8000)
+    else:
+        length = random.randint(8000, 200000)
+
+    text = ' '.join(random.choices(WORDS, k=length // 6 + 1))
+    return text[:length]
+
+
+async def seed(users: int, notes: int, skew: float, deleted_fraction: float, years: int):
+    conn = await asyncpg.connect(raw_database_url())
+    password = hash_password_func('seed-password')
+    now = datetime.now(timezone.utc)
+    span_seconds = years * 365 * 24 * 3600
+
+    try:
+        user_ids = [uuid4() for _ in range(users)]
+
+        started = time.perf_counter()
+        for offset in range(0, users, BATCH_SIZE):
+            records = [
+                (user_ids[i], f'Seed User {i}', f'seed-{i}@example.com', password)
+                for i in range(offset, min(offset + BATCH_SIZE, users))
+            ]
+            await conn.copy_records_to_table('users', records=records, columns=['id', 'name', 'email', 'password'])
+
+        print(f"users: {users} in {time.perf_counter() - started:.1f}s")
+
+        counts = notes_per_user(users, notes, skew)
+        print(f"heaviest user has {counts[0]} notes, median user has {sorted(counts)[users // 2]}")
+
+        started = time.perf_counter()
+        batch = []
+        loaded = 0
+
+        for user_id, count in zip(user_ids, counts):
+            for _ in range(count):
+                created_at = now - timedelta(seconds=random.randint(0, span_seconds))
+                updated_at = created_at + timedelta(seconds=random.randint(0, int((now - created_at).total_seconds())))
+
+                batch.append((
+                    uuid4(),
+                    user_id,
+                    random.random() < deleted_fraction,
+                    f'{random.choice(WORDS)} {random.choice(WORDS)} {random.randint(0, 9999)}',
+                    random_content(),
+                    random_tags(),
+                    created_at,
+                    updated_at,
+                ))
+
+                if len(batch) >= BATCH_SIZE:
+                    await conn.copy_records_to_table('notes', records=batch, columns=['id', 'user_id', 'is_deleted', 'title', 'content', 'tags', 'created_at', 'updated_at'])
+                    loaded += len(batch)
+                    batch = []
+                    print(f"notes: {loaded}", end='\r')
+
+        if batch:
+            await conn.copy_records_to_table('notes', records=batch, columns=['id', 'user_id', 'is_deleted', 'title', 'content', 'tags', 'created_at', 'updated_at'])
+            loaded += len(batch)
+
+        print(f"notes: {loaded} in {time.perf_counter() - started:.1f}s")
+
+        #COPY bypasses the controllers, so the tag facet counters are built once here
+        await conn.execute('''
+            INSERT INTO note_tag_counts (user_id, tag, count)
+            SELECT user_id, tag, count(*) FROM notes, unnest(tags) AS tag
+            WHERE NOT is_deleted
+            GROUP BY user_id, tag
+            ON CONFLICT (user_id, tag) DO UPDATE SET count = note_tag_counts.count + excluded.count
+        ''')
+
+        await conn.execute('ANALYZE users')
+        await conn.execute('ANALYZE notes')
+
+    finally:
+        await conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--notes', type=int, default=2000000)
+    parser.add_argument('--skew', type=float, default=1.1, help='power-law exponent for notes per user')
+    parser.add_argument('--deleted-fraction', type=float, default=0.1)
+    parser.add_argument('--years', type=int, default=3)
+    args = parser.parse_args()
+
+    asyncio.run(seed(args.users, args.notes, args.skew, args.deleted_fraction, args.years))
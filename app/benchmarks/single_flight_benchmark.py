@@ -0,0 +1,84 @@
+"""
+DB statements and latency for a burst of identical list requests, with and without
+single-flight coalescing. Simulates one user's tabs/devices hitting GET /api/notes at once.
+
+    python -m benchmarks.single_flight_benchmark --fan-out 50 --rounds 20
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+from sqlalchemy import event, delete
+from database.db import SessionLocal, engine
+from models.auth_models import User
+from models.notes_models import Note
+from controllers.notes_controllers import NoteController
+from utils.single_flight import read_coalescer
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, 'before_cursor_execute', self._on_execute)
+
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+
+async def direct(user_id):
+    async with SessionLocal() as db:
+        return (await NoteController.list_notes_func(user_id, db, 1, 10, None)).model_dump_json()
+
+
+async def coalesced(user_id):
+    async def work(db):
+        return (await NoteController.list_notes_func(user_id, db, 1, 10, None)).model_dump_json()
+
+    return await read_coalescer.run((str(user_id), 'list', 1, 10, None), work)
+
+
+async def measure(name, call, user_id, fan_out: int, rounds: int, counter: StatementCounter):
+    before = counter.count
+    started = time.perf_counter()
+
+    for _ in range(rounds):
+        await asyncio.gather(*(call(user_id) for _ in range(fan_out)))
+
+    elapsed = time.perf_counter() - started
+    requests = fan_out * rounds
+    statements = counter.count - before
+
+    print(f"{name:<10} {requests:>6} requests  {statements:>6} statements  {statements / requests:6.2f}/request  {elapsed / rounds * 1000:8.1f}ms per burst")
+
+
+async def main(fan_out: int, rounds: int, notes: int):
+    counter = StatementCounter()
+    user_id = uuid4()
+
+    async with SessionLocal() as db:
+        db.add(User(id=user_id, name='bench', email=f'single-flight-{user_id.hex[:8]}@example.com', password='x'))
+        await db.flush()
+        db.add_all([Note(user_id=user_id, title=f'note {i}', content='bench ' * 100) for i in range(notes)])
+        await db.commit()
+
+    try:
+        await measure('direct', direct, user_id, fan_out, rounds, counter)
+        await measure('coalesced', coalesced, user_id, fan_out, rounds, counter)
+
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--fan-out', type=int, default=50, help='identical concurrent requests per burst')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--notes', type=int, default=500)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.fan_out, args.rounds, args.notes))
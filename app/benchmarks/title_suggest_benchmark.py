@@ -0,0 +1,63 @@
+"""
+Latency of title suggestions from the in-memory prefix index, plus the cost of building it
+and of applying writes. Needs no database: titles are synthetic.
+
+    python -m benchmarks.title_suggest_benchmark --notes 100000
+"""
+import argparse
+import random
+import time
+from uuid import uuid4
+from utils.title_suggestions import UserTitleIndex
+from benchmarks.seed_dataset import WORDS
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def random_title() -> str:
+    return f'{random.choice(WORDS)} {random.choice(WORDS)} {random.randint(0, 9999)}'
+
+
+def report(name, timings):
+    print(f"{name:<12} p50 {percentile(timings, 0.5) * 1e6:8.1f}us  p99 {percentile(timings, 0.99) * 1e6:8.1f}us  max {max(timings) * 1e6:8.1f}us")
+
+
+def main(notes: int, lookups: int, limit: int):
+    rows = [(uuid4(), random_title()) for _ in range(notes)]
+
+    started = time.perf_counter()
+    index = UserTitleIndex(rows, (0, 0))
+    print(f"built index of {len(index.keys)} keys for {notes} notes in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    for length in (1, 2, 4, 8):
+        timings = []
+
+        for _ in range(lookups):
+            prefix = random.choice(WORDS)[:length]
+            started = time.perf_counter()
+            index.suggest(prefix, limit)
+            timings.append(time.perf_counter() - started)
+
+        report(f'prefix {length}', timings)
+
+    timings = []
+
+    for note_id, _ in random.sample(rows, min(lookups, notes)):
+        started = time.perf_counter()
+        index.put(str(note_id), random_title())
+        timings.append(time.perf_counter() - started)
+
+    report('update', timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--notes', type=int, default=100000, help='notes owned by the user')
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    main(args.notes, args.lookups, args.limit)
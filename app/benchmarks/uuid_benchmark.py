@@ -0,0 +1,85 @@
+"""
+Insert throughput and primary-key index size for uuid4 vs UUIDv7 keys.
+
+Creates two scratch tables shaped like notes' key (uuid primary key plus a small payload),
+inserts the same number of rows into each in multi-row INSERT batches, and reports rows/s,
+index size and leaf density. The scratch tables are dropped afterwards.
+
+    python -m benchmarks.uuid_benchmark --rows 10000000
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+import asyncpg
+from dotenv import load_dotenv # type: ignore
+from benchmarks.seed_dataset import raw_database_url
+from utils.uuid7 import uuid7
+
+
+load_dotenv()
+
+BATCH_SIZE = 5000
+
+
+async def run(conn, name: str, generate, rows: int, report_every: int):
+    table = f'bench_keys_{name}'
+
+    await conn.execute(f'DROP TABLE IF EXISTS {table}')
+    await conn.execute(f'CREATE TABLE {table} (id uuid PRIMARY KEY, payload int NOT NULL)')
+
+    #INSERT rather than COPY so every row goes through the B-tree the way application inserts do
+    statement = f'INSERT INTO {table} (id, payload) SELECT * FROM unnest($1::uuid[], $2::int[])'
+
+    started = time.perf_counter()
+    window_started = started
+    inserted = 0
+
+    while inserted < rows:
+        count = min(BATCH_SIZE, rows - inserted)
+        await conn.execute(statement, [generate() for _ in range(count)], list(range(count)))
+        inserted += count
+
+        if inserted % report_every < BATCH_SIZE:
+            now = time.perf_counter()
+            print(f"{name:<6} {inserted:>10} rows  {report_every / (now - window_started):>9.0f} rows/s (recent)", flush=True)
+            window_started = now
+
+    elapsed = time.perf_counter() - started
+
+    index_size = await conn.fetchval(f"SELECT pg_relation_size('{table}_pkey')")
+    leaf_density = None
+
+    if await conn.fetchval("SELECT count(*) FROM pg_extension WHERE extname = 'pgstattuple'"):
+        leaf_density = await conn.fetchval(f"SELECT avg_leaf_density FROM pgstatindex('{table}_pkey')")
+
+    await conn.execute(f'DROP TABLE {table}')
+
+    return {'name': name, 'rows_per_second': rows / elapsed, 'index_bytes': index_size, 'leaf_density': leaf_density}
+
+
+async def main(rows: int, report_every: int):
+    conn = await asyncpg.connect(raw_database_url())
+
+    try:
+        results = [
+            await run(conn, 'uuid4', uuid4, rows, report_every),
+            await run(conn, 'uuid7', uuid7, rows, report_every),
+        ]
+
+    finally:
+        await conn.close()
+
+    print()
+    for result in results:
+        density = f"{result['leaf_density']:.1f}%" if result['leaf_density'] is not None else 'n/a (needs pgstattuple)'
+        print(f"{result['name']:<6} {result['rows_per_second']:>9.0f} rows/s  index {result['index_bytes'] / 1024 / 1024:>8.1f} MiB  leaf density {density}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--report-every', type=int, default=1000000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.report_every))
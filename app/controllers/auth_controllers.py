@@ -1,15 +1,18 @@
 from schemas.auth_schemas import UserCreateSchema, UserLoginSchema
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
-from fastapi import HTTPException, Response
+from fastapi import HTTPException, Response, Request
 from sqlalchemy import select
-from itsdangerous import Signer
+from sqlalchemy.dialects.postgresql import insert
+from itsdangerous import Signer, BadSignature
 from models.auth_models import User
-from utils.hash_services import hash_password_func, verify_password
+from utils.hash_services import hash_password_async, verify_password_async, dummy_verify_password_async
 from utils.token_services import generate_access_token, generate_refresh_token
 import os
 from utils.token_services import verify_token
 from jose.exceptions import JWTError, ExpiredSignatureError
+from utils.login_throttle import login_throttle
+from utils.token_revocation import revocation_store
 
 
 class AuthController():
@@ -18,28 +21,28 @@ class AuthController():
     @staticmethod
     async def signup_func(data: UserCreateSchema, db: AsyncSession, res: Response):
         try:
-            statement = select(User).where(User.email==data.email)
+            hashed_password = await hash_password_async(data.password)
+            
+            # one round trip, and concurrent signups for the same email can't race into a unique violation
+            statement = (
+                insert(User)
+                .values(email=data.email, name=data.name, password=hashed_password)
+                .on_conflict_do_nothing(index_elements=[User.email])
+                .returning(User.id)
+            )
             
             result = await db.execute(statement)
                         
-            user = result.scalar_one_or_none()
+            new_user_id = result.scalar_one_or_none()
                         
-            if user:
+            if new_user_id is None:
                 raise HTTPException(status_code=400, detail='Email or username already exist!')
             
-            hashed_password = hash_password_func(data.password)
-            
-            new_user = User(email=data.email, name=data.name,  password=hashed_password)
-                        
-            db.add(new_user)
-            
             await db.commit()
             
-            await db.refresh(new_user)
-            
-            access_token = generate_access_token({'id': new_user.id})
+            access_token = generate_access_token({'id': new_user_id})
             
-            refresh_token =  generate_refresh_token({'id': new_user.id})
+            refresh_token =  generate_refresh_token({'id': new_user_id})
             
             signed_refresh_token = AuthController.signer.sign(refresh_token.encode()).decode()
             
@@ -68,21 +71,34 @@ class AuthController():
     
     
     @staticmethod
-    async def login_func(data: UserLoginSchema, db: AsyncSession, res: Response):
+    async def login_func(data: UserLoginSchema, db: AsyncSession, res: Response, request: Request):
         try:
-            statement1 = select(User).where(User.email==data.email)
+            retry_after = login_throttle.check(data.email, request)
             
-            result = await db.execute(statement1)
+            if retry_after:
+                raise HTTPException(
+                    status_code=429,
+                    detail='Too many failed login attempts, try again later!',
+                    headers={'Retry-After': str(retry_after)}
+                )
+            
+            statement1 = select(User.id, User.password).where(User.email==data.email)
             
-            exisiting_user = result.scalar_one_or_none()
+            result = await db.execute(statement1)
             
-            if not exisiting_user:
-                raise HTTPException(status_code=404, detail='User does not exist!')
+            exisiting_user = result.one_or_none()
             
-            is_match = verify_password(data.password, exisiting_user.password)
+            # unknown emails still pay for one bcrypt so they can't be told apart from a wrong password
+            if exisiting_user:
+                is_match = await verify_password_async(data.password, exisiting_user.password)
+            else:
+                is_match = await dummy_verify_password_async(data.password)
             
             if not is_match:
-                raise HTTPException(status_code=400, detail='Incorrect password!')
+                login_throttle.record_failure(data.email, request)
+                raise HTTPException(status_code=400, detail='Incorrect email or password!')
+            
+            login_throttle.record_success(data.email, request)
             
             access_token = generate_access_token({'id': exisiting_user.id})
             
@@ -127,6 +143,9 @@ class AuthController():
             if payload.get('type') == 'access':
                 raise HTTPException(status_code=403, detail='Invalid token type!')
             
+            if revocation_store.is_revoked(payload.get('jti')):
+                raise HTTPException(status_code=401, detail='Token has been revoked')
+            
             new_access_token = generate_access_token({'id': payload.get('id')})
                         
             return  new_access_token
@@ -147,7 +166,28 @@ class AuthController():
 
     
     @staticmethod
-    async def logout_user_func(res: Response):
+    async def logout_user_func(res: Response, payload: dict, refresh: str, db: AsyncSession):
+        try:
+            await revocation_store.revoke(payload.get('jti'), payload.get('exp'), db)
+            
+            refresh_payload = None
+            
+            if refresh:
+                try:
+                    unsigned_refresh_token = AuthController.signer.unsign(refresh.encode()).decode()
+                    refresh_payload = verify_token(unsigned_refresh_token, 'refresh')
+                
+                except (BadSignature, UnicodeDecodeError, HTTPException):
+                    #an invalid or expired refresh cookie can't be used anyway
+                    pass
+            
+            if refresh_payload is not None:
+                await revocation_store.revoke(refresh_payload.get('jti'), refresh_payload.get('exp'), db)
+            
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail='Database error!')
+        
         res.delete_cookie("refreshToken")
         return {"message": "Logged out successfully"}
         
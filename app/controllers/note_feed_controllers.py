@@ -0,0 +1,158 @@
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from database.db import SessionLocal
+from models.notes_models import Note
+from utils.note_feed import note_feed
+from uuid import UUID
+from typing import Optional
+from datetime import datetime, timedelta
+import asyncio
+import json
+import os
+
+
+HEARTBEAT_SECONDS = float(os.getenv('NOTE_FEED_HEARTBEAT', 15))
+CATCH_UP_BATCH = 500
+
+# updated_at is the writing transaction's start time, not its commit time, so a write can become
+# visible after later-stamped ones were already sent; catch-up re-reads this far behind the watermark
+REPLAY_WINDOW = timedelta(seconds=float(os.getenv('NOTE_FEED_REPLAY_WINDOW', 60)))
+
+
+def format_event(op: str, note_id: str, ts: datetime, watermark: datetime) -> str:
+    # the event id is the stream's watermark (the newest ts sent so far), which events can arrive behind
+    data = json.dumps({'op': op, 'note_id': note_id, 'ts': ts.isoformat()})
+    return f"id: {watermark.isoformat()}\nevent: {op}\ndata: {data}\n\n"
+
+
+class SeenEvents:
+    """(note_id, op, version) of events sent within the replay window, so overlapping replays aren't sent twice."""
+
+    def __init__(self):
+        self.keys = {}
+
+
+    def add(self, key: tuple, ts: datetime) -> bool:
+        """False if the event was already sent."""
+        if key in self.keys:
+            return False
+
+        self.keys[key] = ts
+        return True
+
+
+    def forget_before(self, watermark: datetime):
+        horizon = watermark - REPLAY_WINDOW
+        self.keys = {key: ts for key, ts in self.keys.items() if ts >= horizon}
+
+
+class NoteFeedController:
+    
+    @staticmethod
+    async def catch_up(user_id: UUID, watermark: datetime, seen: SeenEvents):
+        """
+        Replays changes from the notes table itself, oldest first, starting REPLAY_WINDOW before
+        the watermark. Events already sent on this stream are skipped; a client resuming on a
+        new stream may get some of the overlap again.
+        """
+        after = (watermark - REPLAY_WINDOW, None)
+        
+        while True:
+            # short-lived session so an open stream never holds a pooled connection
+            async with SessionLocal() as db:
+                statement = (
+                    select(Note.id, Note.version, Note.created_at, Note.updated_at, Note.is_deleted)
+                    .where(
+                        Note.user_id == user_id,
+                        Note.updated_at > after[0] if after[1] is None else tuple_(Note.updated_at, Note.id) > after
+                    )
+                    .order_by(Note.updated_at, Note.id)
+                    .limit(CATCH_UP_BATCH)
+                )
+                rows = (await db.execute(statement)).all()
+            
+            for note_id, version, created_at, updated_at, is_deleted in rows:
+                if is_deleted:
+                    op = 'deleted'
+                elif created_at == updated_at:
+                    op = 'created'
+                else:
+                    op = 'updated'
+                
+                after = (updated_at, note_id)
+                watermark = max(watermark, updated_at)
+                
+                if seen.add((str(note_id), op, version), updated_at):
+                    yield watermark, format_event(op, str(note_id), updated_at, watermark)
+            
+            if len(rows) < CATCH_UP_BATCH:
+                seen.forget_before(watermark)
+                return
+    
+    
+    @staticmethod
+    async def stream_func(user_id: UUID, since: Optional[str], request: Request) -> StreamingResponse:
+        if not note_feed.enabled:
+            raise HTTPException(status_code=404, detail="Note change feed is disabled")
+        
+        watermark = None
+        
+        if since:
+            try:
+                watermark = datetime.fromisoformat(since)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid watermark, expected an ISO 8601 timestamp")
+        
+        async def events():
+            nonlocal watermark
+            
+            # subscribe before catching up so nothing committed in between is missed
+            subscriber = note_feed.subscribe(str(user_id))
+            seen = SeenEvents()
+            
+            try:
+                yield "retry: 3000\n\n"
+                
+                if watermark is not None:
+                    async for watermark, chunk in NoteFeedController.catch_up(user_id, watermark, seen):
+                        yield chunk
+                
+                while True:
+                    if await request.is_disconnected():
+                        return
+                    
+                    try:
+                        event = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+                    
+                    except asyncio.TimeoutError:
+                        yield ": ping\n\n"
+                        continue
+                    
+                    if event['type'] == 'resync':
+                        if watermark is None:
+                            # nothing to resume from; tell the client to refetch its list
+                            yield "event: resync\ndata: {}\n\n"
+                        else:
+                            async for watermark, chunk in NoteFeedController.catch_up(user_id, watermark, seen):
+                                yield chunk
+                        continue
+                    
+                    ts = datetime.fromisoformat(event['ts'])
+                    
+                    # commits arrive in commit order, not ts order, so an older ts is still new here
+                    if not seen.add((event['note_id'], event['op'], event['version']), ts):
+                        continue
+                    
+                    watermark = ts if watermark is None else max(watermark, ts)
+                    seen.forget_before(watermark)
+                    yield format_event(event['op'], event['note_id'], ts, watermark)
+            
+            finally:
+                note_feed.unsubscribe(subscriber)
+        
+        return StreamingResponse(
+            events(),
+            media_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
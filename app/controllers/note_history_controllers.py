@@ -0,0 +1,135 @@
+from schemas.note_schemas import NoteResponseSchema, NoteHistoryResponseSchema, NoteRevisionSchema, NoteRevisionContentSchema
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from models.notes_models import Note
+from models.note_revision_models import NoteRevision
+from uuid import UUID
+from utils.note_feed import note_feed
+from utils.note_history import note_history
+from utils.result_cache import result_cache
+from utils.title_suggestions import title_suggestions
+from utils.note_stats import record_activity
+
+
+
+class NoteHistoryController:
+
+    @staticmethod
+    async def owned_note_exists(note_id: UUID, user_id: UUID, db: AsyncSession) -> bool:
+        statement = select(Note.id).where(Note.id == note_id, Note.user_id == user_id, Note.is_deleted == False)
+        return (await db.execute(statement)).scalar_one_or_none() is not None
+
+
+    @staticmethod
+    async def history_func(note_id: UUID, user_id: UUID, db: AsyncSession) -> NoteHistoryResponseSchema:
+        try:
+            if not await NoteHistoryController.owned_note_exists(note_id, user_id, db):
+                raise HTTPException(status_code=404, detail="Note not found or you don't have permission to access it")
+
+            # metadata only; the compressed bodies are never read for a listing
+            statement = (
+                select(NoteRevision.version, NoteRevision.title, NoteRevision.content_length, NoteRevision.is_snapshot, NoteRevision.created_at)
+                .where(NoteRevision.note_id == note_id)
+                .order_by(NoteRevision.version.desc())
+            )
+
+            rows = (await db.execute(statement)).all()
+
+            return NoteHistoryResponseSchema(
+                note_id=note_id,
+                revisions=[NoteRevisionSchema.model_validate(row) for row in rows]
+            )
+
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error")
+
+        except Exception as e:
+            error_dict = e.__dict__
+
+            raise HTTPException(
+                status_code=error_dict.get('status_code', 500),
+                detail=error_dict.get('detail', 'Internal server error')
+            )
+
+
+    @staticmethod
+    async def get_revision_func(note_id: UUID, version: int, user_id: UUID, db: AsyncSession) -> NoteRevisionContentSchema:
+        try:
+            if not await NoteHistoryController.owned_note_exists(note_id, user_id, db):
+                raise HTTPException(status_code=404, detail="Note not found or you don't have permission to access it")
+
+            revision = await note_history.reconstruct(db, note_id, version)
+
+            if revision is None:
+                raise HTTPException(status_code=404, detail="Revision not found")
+
+            title, content = revision
+
+            return NoteRevisionContentSchema(note_id=note_id, version=version, title=title, content=content)
+
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error")
+
+        except Exception as e:
+            error_dict = e.__dict__
+
+            raise HTTPException(
+                status_code=error_dict.get('status_code', 500),
+                detail=error_dict.get('detail', 'Internal server error')
+            )
+
+
+    @staticmethod
+    async def restore_revision_func(note_id: UUID, version: int, user_id: UUID, db: AsyncSession) -> NoteResponseSchema:
+        try:
+            # lock the note so the restored revision becomes exactly the next version
+            check_statement = select(Note).where(Note.id == note_id, Note.user_id == user_id, Note.is_deleted == False).with_for_update()
+
+            existing_note = (await db.execute(check_statement)).scalar_one_or_none()
+
+            if not existing_note:
+                raise HTTPException(status_code=404, detail="Note not found or you don't have permission to update it")
+
+            revision = await note_history.reconstruct(db, note_id, version)
+
+            if revision is None:
+                raise HTTPException(status_code=404, detail="Revision not found")
+
+            title, content = revision
+
+            # restoring writes a new version rather than rewinding, so history stays append-only
+            update_statement = (
+                update(Note)
+                .where(Note.id == note_id)
+                .values(title=title, content=content, version=Note.version + 1)
+                .returning(Note.version)
+                .execution_options(synchronize_session="fetch")
+            )
+
+            new_version = (await db.execute(update_statement)).scalar_one()
+
+            await note_history.record(db, note_id, new_version, title, content)
+            await record_activity(db, user_id, updated=1)
+            await note_feed.publish(db, note_id, 'updated')
+            await db.commit()
+            previous_generation = result_cache.bump(user_id)
+            title_suggestions.note_written(user_id, previous_generation, note_id, title)
+
+            await db.refresh(existing_note)
+
+            return NoteResponseSchema.model_validate(existing_note)
+
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error")
+
+        except Exception as e:
+            await db.rollback()
+            error_dict = e.__dict__
+
+            raise HTTPException(
+                status_code=error_dict.get('status_code', 500),
+                detail=error_dict.get('detail', 'Internal server error')
+            )
@@ -1,12 +1,24 @@
-from schemas.note_schemas import NoteCreateSchema, NoteUpdateSchema, NoteResponseSchema, NoteListResponseSchema, NoteSearchSchema
+from schemas.note_schemas import NoteCreateSchema, NoteUpdateSchema, NoteResponseSchema, NoteListResponseSchema, NoteSearchSchema, NotePatchSchema, NotePatchResponseSchema, TagFacetSchema, TagFacetsResponseSchema, NoteDailyStatSchema, NoteStatsResponseSchema, TitleSuggestionSchema, TitleSuggestionsResponseSchema
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from fastapi import HTTPException, Query
-from sqlalchemy import select, update, delete, func, and_
+from sqlalchemy import select, update, delete, func, and_, union_all, cast, null, literal, LargeBinary, String, Boolean, Text
 from models.notes_models import Note
+from database.db import SessionLocal
+from models.note_tag_models import NoteTagCount
+from models.note_stats_models import NoteDailyStats
+from models.note_archive_models import ArchivedNote
 from uuid import UUID
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, date
+from utils.note_feed import note_feed
+from utils.note_batcher import note_batcher
+from utils.result_cache import result_cache
+from utils.title_suggestions import title_suggestions, normalize_title
+from utils.note_archive import note_archive, archived_content
+from utils.note_history import note_history
+from utils.note_tags import adjust_tag_counts
+from utils.note_stats import record_activity
 
 
 
@@ -14,16 +26,30 @@ class NoteController:
     
     @staticmethod
     async def create_note_func(data: NoteCreateSchema, user_id: UUID, db: AsyncSession) -> NoteResponseSchema:
+        if note_batcher.enabled:
+            # group commit: this note is inserted with others queued in the same few milliseconds
+            return await note_batcher.submit(data, user_id)
+        
         try:
             new_note = Note(
                 title=data.title,
                 content=data.content,
+                tags=data.tags,
                 user_id=user_id
             )
             
             db.add(new_note)
             
+            await db.flush()
+            await adjust_tag_counts(db, user_id, added=data.tags)
+            await record_activity(db, user_id, created=1)
+            await note_history.record(db, new_note.id, 1, new_note.title, new_note.content)
+            await note_feed.publish(db, new_note.id, 'created')
+            
             await db.commit()
+            previous_generation = result_cache.bump(user_id)
+            title_suggestions.note_written(user_id, previous_generation, new_note.id, data.title)
+            
             await db.refresh(new_note)
             
             return NoteResponseSchema.model_validate(new_note)
@@ -59,11 +85,17 @@ class NoteController:
             
             note = result.scalar_one_or_none()
             
-            if not note:
+            if note:
+                return NoteResponseSchema.model_validate(note)
+            
+            # a miss in the hot table costs one more primary key lookup in the archive
+            archived = await note_archive.get(db, note_id, user_id)
+            
+            if not archived:
                 raise HTTPException(status_code=404, detail="Note not found or you don't have permission to access it"
                 )
             
-            return NoteResponseSchema.model_validate(note)
+            return NoteController.archived_note_response(archived)
             
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -77,10 +109,35 @@ class NoteController:
             )
     
     
+    @staticmethod
+    def archived_note_response(row) -> NoteResponseSchema:
+        return NoteResponseSchema(
+            id=row.id,
+            user_id=row.user_id,
+            title=row.title,
+            content=archived_content(row),
+            tags=row.tags,
+            version=row.version,
+            archived=True,
+            created_at=row.created_at,
+            updated_at=row.updated_at
+        )
+    
+    
+    @staticmethod
+    def tag_filter(tags: list[str], tag_match: str = 'all'):
+        # @> (all) and && (any) are both served by the (user_id, tags) GIN index
+        return Note.tags.overlap(tags) if tag_match == 'any' else Note.tags.contains(tags)
+    
+    
     @staticmethod
     async def list_notes_func(user_id: UUID, db: AsyncSession, page: int = Query(1, ge=1, description="Page number"), page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-        search: Optional[str] = Query(None, description="Search in title and content")
+        search: Optional[str] = Query(None, description="Search in title and content"),
+        tags: Optional[list[str]] = None, tag_match: str = 'all', sort: str = 'updated', cursor: Optional[UUID] = None, include_archived: bool = False
     ) -> NoteListResponseSchema:
+        if include_archived:
+            return await NoteController.list_notes_with_archive_func(user_id, db, page, page_size, search, tags, tag_match, sort, cursor)
+        
         try:
             query = select(Note).where(Note.user_id == user_id, Note.is_deleted == False)
             
@@ -93,24 +150,48 @@ class NoteController:
             if search:
                 count_query = count_query.where(search_filter)
             
-            total_result = await db.execute(count_query)
-            total = total_result.scalar_one()
+            if tags:
+                tag_filter = NoteController.tag_filter(tags, tag_match)
+                query = query.where(tag_filter)
+                count_query = count_query.where(tag_filter)
+            
+            keyset = sort == 'created' and cursor is not None
+            total = total_pages = None
+            
+            # counting walks every matching note, so cursor pages skip it to keep deep pages constant-cost
+            if not keyset:
+                total = (await db.execute(count_query)).scalar_one()
+                total_pages = (total + page_size - 1) // page_size
             
             offset = (page - 1) * page_size
             
-            total_pages = (total + page_size - 1) // page_size
+            next_cursor = None
             
-            query = query.offset(offset).limit(page_size).order_by(Note.updated_at.desc())
+            if sort == 'created':
+                # UUIDv7 ids sort by creation time, so (user_id, id) gives keyset pages with no OFFSET;
+                # older uuid4 rows land in random positions, as the sort parameter's description warns
+                if keyset:
+                    query = query.where(Note.id < cursor)
+                else:
+                    query = query.offset(offset)
+                
+                query = query.limit(page_size).order_by(Note.id.desc())
+            else:
+                query = query.offset(offset).limit(page_size).order_by(Note.updated_at.desc())
             
             result = await db.execute(query)
             notes = result.scalars().all()
             
+            if sort == 'created' and len(notes) == page_size:
+                next_cursor = notes[-1].id
+            
             return NoteListResponseSchema(
                 notes=[NoteResponseSchema.model_validate(note) for note in notes],
                 total=total,
                 page=page,
                 page_size=page_size,
-                total_pages=total_pages
+                total_pages=total_pages,
+                next_cursor=next_cursor
             )
             
         except SQLAlchemyError as e:
@@ -127,16 +208,113 @@ class NoteController:
             )
             
     
+    @staticmethod
+    async def list_notes_with_archive_func(user_id: UUID, db: AsyncSession, page: int = 1, page_size: int = 10, search: Optional[str] = None,
+        tags: Optional[list[str]] = None, tag_match: str = 'all', sort: str = 'updated', cursor: Optional[UUID] = None
+    ) -> NoteListResponseSchema:
+        try:
+            hot_conditions = [Note.user_id == user_id, Note.is_deleted == False]
+            
+            # archived content is compressed, so search only matches archived titles
+            cold_conditions = [ArchivedNote.user_id == user_id]
+            
+            if search:
+                hot_conditions.append(Note.title.ilike(f"%{search}%") | Note.content.ilike(f"%{search}%"))
+                cold_conditions.append(ArchivedNote.title.ilike(f"%{search}%"))
+            
+            if tags:
+                hot_conditions.append(NoteController.tag_filter(tags, tag_match))
+                cold_conditions.append(ArchivedNote.tags.overlap(tags) if tag_match == 'any' else ArchivedNote.tags.contains(tags))
+            
+            keyset = sort == 'created' and cursor is not None
+            total = None
+            
+            if not keyset:
+                total = (await db.execute(select(func.count()).select_from(Note).where(*hot_conditions))).scalar_one()
+                total += (await db.execute(select(func.count()).select_from(ArchivedNote).where(*cold_conditions))).scalar_one()
+            
+            offset = (page - 1) * page_size
+            
+            if keyset:
+                hot_conditions.append(Note.id < cursor)
+                cold_conditions.append(ArchivedNote.id < cursor)
+                offset = 0
+            
+            hot_order = Note.id.desc() if sort == 'created' else Note.updated_at.desc()
+            cold_order = ArchivedNote.id.desc() if sort == 'created' else ArchivedNote.updated_at.desc()
+            
+            # each side is cut to the rows the page could need before the two are merged
+            hot = (
+                select(
+                    Note.id, Note.user_id, Note.title, Note.content,
+                    cast(null(), LargeBinary).label('data'), cast(null(), String).label('codec'), literal(False).label('content_is_null'),
+                    Note.tags, Note.version, Note.created_at, Note.updated_at, literal(False).label('archived')
+                )
+                .where(*hot_conditions).order_by(hot_order).limit(offset + page_size)
+            )
+            cold = (
+                select(
+                    ArchivedNote.id, ArchivedNote.user_id, ArchivedNote.title, cast(null(), Text).label('content'),
+                    ArchivedNote.data, ArchivedNote.codec, ArchivedNote.content_is_null,
+                    ArchivedNote.tags, ArchivedNote.version, ArchivedNote.created_at, ArchivedNote.updated_at, literal(True).label('archived')
+                )
+                .where(*cold_conditions).order_by(cold_order).limit(offset + page_size)
+            )
+            
+            merged = union_all(hot.subquery().select(), cold.subquery().select()).subquery()
+            merged_order = merged.c.id.desc() if sort == 'created' else merged.c.updated_at.desc()
+            
+            rows = (await db.execute(select(merged).order_by(merged_order).offset(offset).limit(page_size))).all()
+            
+            notes = [
+                NoteController.archived_note_response(row) if row.archived else NoteResponseSchema(
+                    id=row.id, user_id=row.user_id, title=row.title, content=row.content, tags=row.tags,
+                    version=row.version, created_at=row.created_at, updated_at=row.updated_at
+                )
+                for row in rows
+            ]
+            
+            return NoteListResponseSchema(
+                notes=notes,
+                total=total,
+                page=page,
+                page_size=page_size,
+                total_pages=None if total is None else (total + page_size - 1) // page_size,
+                next_cursor=notes[-1].id if sort == 'created' and len(notes) == page_size else None
+            )
+            
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error")
+            
+        except Exception as e:
+            await db.rollback()
+            error_dict = e.__dict__
+            
+            raise HTTPException(
+                status_code=error_dict.get('status_code', 500),
+                detail=error_dict.get('detail', 'Internal server error')
+            )
+    
+    
     @staticmethod
     async def update_note_func(note_id: UUID, data: NoteUpdateSchema, user_id: UUID, db: AsyncSession) -> NoteResponseSchema:
         try:
             check_statement = select(Note).where(Note.id == note_id,
                 Note.user_id == user_id)
             
+            if data.tags is not None:
+                # the tag counters are adjusted from the old tags, so concurrent retags must not interleave
+                check_statement = check_statement.with_for_update()
+            
             check_result = await db.execute(check_statement)
             
             existing_note = check_result.scalar_one_or_none()
             
+            if not existing_note and await note_archive.restore(db, note_id, user_id):
+                # archived notes move back to the hot table before they are written
+                existing_note = (await db.execute(check_statement)).scalar_one_or_none()
+            
             if not existing_note:
                 raise HTTPException(status_code=404, detail="Note not found or you don't have permission to update it")
             
@@ -148,11 +326,32 @@ class NoteController:
             if data.content is not None:
                 update_data['content'] = data.content
             
-            update_statement = (update(Note).where(Note.id == note_id, Note.user_id == user_id).values(**update_data).execution_options(synchronize_session="fetch")
+            if data.tags is not None:
+                update_data['tags'] = data.tags
+                
+                if not existing_note.is_deleted:
+                    old_tags = set(existing_note.tags or [])
+                    await adjust_tag_counts(db, user_id, added=set(data.tags) - old_tags, removed=old_tags - set(data.tags))
+            
+            update_data['version'] = Note.version + 1
+            
+            update_statement = (update(Note).where(Note.id == note_id, Note.user_id == user_id).values(**update_data).returning(Note.version, Note.title, Note.content).execution_options(synchronize_session="fetch")
             )
             
-            await db.execute(update_statement)
-            await db.commit()
+            updated = (await db.execute(update_statement)).one()
+            
+            if existing_note.is_deleted:
+                # a deleted note still accepts edits, but it is gone for the user: no history,
+                # stats or feed event, and its title must not come back into suggestions
+                await db.commit()
+            
+            else:
+                await note_history.record(db, note_id, updated.version, updated.title, updated.content)
+                await record_activity(db, user_id, updated=1)
+                await note_feed.publish(db, note_id, 'updated')
+                await db.commit()
+                previous_generation = result_cache.bump(user_id)
+                title_suggestions.note_written(user_id, previous_generation, note_id, updated.title)
             
             await db.refresh(existing_note)
             
@@ -172,6 +371,106 @@ class NoteController:
             )
     
     
+    @staticmethod
+    def apply_patch_ops(content: str, data: NotePatchSchema) -> str:
+        for operation in data.ops:
+            if operation.op == 'append':
+                content = content + operation.text
+                continue
+            
+            if operation.offset is None or operation.offset + operation.delete > len(content):
+                raise HTTPException(status_code=400, detail=f"Splice at {operation.offset} (+{operation.delete}) is outside the note ({len(content)} characters)")
+            
+            content = content[:operation.offset] + operation.text + content[operation.offset + operation.delete:]
+        
+        return content
+    
+    
+    @staticmethod
+    async def patch_note_func(note_id: UUID, data: NotePatchSchema, user_id: UUID, db: AsyncSession) -> NotePatchResponseSchema:
+        try:
+            conditions = [
+                Note.id == note_id,
+                Note.user_id == user_id,
+                Note.is_deleted == False
+            ]
+            
+            returning = [Note.id, Note.version, func.coalesce(func.length(Note.content), 0), Note.updated_at, Note.title]
+            
+            if all(operation.op == 'append' for operation in data.ops):
+                # appends never need the current content, so the database does the whole edit
+                new_content = func.coalesce(Note.content, '').concat(''.join(operation.text for operation in data.ops))
+                
+                if note_history.enabled:
+                    # the revision is diffed here, so only the server ever reads the full note back
+                    returning.append(Note.content)
+            
+            else:
+                check_statement = select(Note.content, Note.version).where(*conditions)
+                
+                existing_note = (await db.execute(check_statement)).one_or_none()
+                
+                if not existing_note and await note_archive.restore(db, note_id, user_id):
+                    existing_note = (await db.execute(check_statement)).one_or_none()
+                
+                if not existing_note:
+                    raise HTTPException(status_code=404, detail="Note not found or you don't have permission to update it")
+                
+                if existing_note.version != data.base_version:
+                    raise HTTPException(status_code=409, detail={"message": "Note has changed since base_version", "current_version": existing_note.version})
+                
+                new_content = NoteController.apply_patch_ops(existing_note.content or '', data)
+            
+            # the version check in the WHERE clause makes the write optimistic: a concurrent edit matches no row
+            update_statement = (
+                update(Note)
+                .where(*conditions, Note.version == data.base_version)
+                .values(content=new_content, version=Note.version + 1)
+                .returning(*returning)
+            )
+            
+            updated = (await db.execute(update_statement)).one_or_none()
+            
+            if not updated:
+                current = (await db.execute(select(Note.version).where(*conditions))).scalar_one_or_none()
+                
+                if current is None and await note_archive.restore(db, note_id, user_id):
+                    # the append fast path only finds out here that the note was archived; retry it hot
+                    return await NoteController.patch_note_func(note_id, data, user_id, db)
+                
+                if current is None:
+                    raise HTTPException(status_code=404, detail="Note not found or you don't have permission to update it")
+                
+                raise HTTPException(status_code=409, detail={"message": "Note has changed since base_version", "current_version": current})
+            
+            await note_history.record(db, note_id, updated[1], updated[4], updated[5] if len(updated) > 5 else new_content)
+            await record_activity(db, user_id, updated=1)
+            await note_feed.publish(db, note_id, 'updated')
+            await db.commit()
+            previous_generation = result_cache.bump(user_id)
+            title_suggestions.note_written(user_id, previous_generation, note_id, updated[4])
+            
+            return NotePatchResponseSchema(
+                id=updated[0],
+                version=updated[1],
+                content_length=updated[2],
+                updated_at=updated[3]
+            )
+            
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise HTTPException(status_code=500, detail=f"Database error")
+            
+        except Exception as e:
+            await db.rollback()
+            error_dict = e.__dict__
+            
+            raise HTTPException(
+                status_code=error_dict.get('status_code', 500),
+                detail=error_dict.get('detail', 'Internal server error')
+            )
+    
+    
     @staticmethod
     async def soft_delete_note_func(note_id: UUID, user_id: UUID, db: AsyncSession) -> dict:
         try:
@@ -182,13 +481,24 @@ class NoteController:
             
             existing_note = check_result.scalar_one_or_none()
             
+            if not existing_note and await note_archive.restore(db, note_id, user_id):
+                existing_note = (await db.execute(check_statement)).scalar_one_or_none()
+            
             if not existing_note:
                 raise HTTPException(status_code=404, detail="Note not found, already deleted, or you don't have permission to delete it")
             
-            update_statement = (update(Note).where(Note.id == note_id, Note.user_id == user_id).values(is_deleted=True))
+            # the tags come from the row the UPDATE locked, so a retag committed since the check can't skew the counts
+            update_statement = (update(Note).where(Note.id == note_id, Note.user_id == user_id, Note.is_deleted == False).values(is_deleted=True).returning(Note.tags))
             
-            await db.execute(update_statement)
+            deleted_tags = (await db.execute(update_statement)).scalar_one_or_none()
+            
+            if deleted_tags is not None:
+                await adjust_tag_counts(db, user_id, removed=deleted_tags)
+                await record_activity(db, user_id, deleted=1)
+            await note_feed.publish(db, note_id, 'deleted')
             await db.commit()
+            previous_generation = result_cache.bump(user_id)
+            title_suggestions.note_written(user_id, previous_generation, note_id, None)
             
             return {
                 "message": "Note soft deleted successfully",
@@ -230,6 +540,9 @@ class NoteController:
                 
                 conditions.append(Note.created_at <= created_before_dt)
             
+            if filters.tags:
+                conditions.append(NoteController.tag_filter(filters.tags, filters.tag_match))
+            
             if filters.created_after and filters.created_before:
                 if filters.created_after > filters.created_before:
                     raise HTTPException(status_code=400, detail="created_after date must be less than or equal to created_before date")
@@ -273,4 +586,112 @@ class NoteController:
             )
             
             
-    
\ No newline at end of file
+    
+    
+    
+    @staticmethod
+    async def tag_facets_func(user_id: UUID, db: AsyncSession) -> TagFacetsResponseSchema:
+        try:
+            # reads the maintained counters, one row per tag, instead of aggregating over notes
+            statement = (
+                select(NoteTagCount.tag, NoteTagCount.count)
+                .where(NoteTagCount.user_id == user_id, NoteTagCount.count > 0)
+                .order_by(NoteTagCount.count.desc(), NoteTagCount.tag)
+            )
+            
+            rows = (await db.execute(statement)).all()
+            
+            return TagFacetsResponseSchema(tags=[TagFacetSchema(tag=tag, count=count) for tag, count in rows])
+            
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error")
+            
+        except Exception as e:
+            error_dict = e.__dict__
+            
+            raise HTTPException(
+                status_code=error_dict.get('status_code', 500),
+                detail=error_dict.get('detail', 'Internal server error')
+            )
+    
+    
+    @staticmethod
+    async def stats_func(user_id: UUID, start: date, end: date, db: AsyncSession) -> NoteStatsResponseSchema:
+        try:
+            if start > end:
+                raise HTTPException(status_code=400, detail="start must be less than or equal to end")
+            
+            # one rollup row per active day, read off the (user_id, day) primary key
+            statement = (
+                select(NoteDailyStats.day, NoteDailyStats.created, NoteDailyStats.updated, NoteDailyStats.deleted)
+                .where(NoteDailyStats.user_id == user_id, NoteDailyStats.day >= start, NoteDailyStats.day <= end)
+                .order_by(NoteDailyStats.day)
+            )
+            
+            rows = (await db.execute(statement)).all()
+            
+            active_statement = select(func.coalesce(func.sum(NoteDailyStats.created - NoteDailyStats.deleted), 0)).where(NoteDailyStats.user_id == user_id)
+            
+            active_notes = (await db.execute(active_statement)).scalar_one()
+            
+            days = [NoteDailyStatSchema.model_validate(row) for row in rows]
+            
+            return NoteStatsResponseSchema(
+                start=start,
+                end=end,
+                days=days,
+                total_created=sum(day.created for day in days),
+                total_updated=sum(day.updated for day in days),
+                total_deleted=sum(day.deleted for day in days),
+                active_notes=active_notes
+            )
+            
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error")
+            
+        except Exception as e:
+            error_dict = e.__dict__
+            
+            raise HTTPException(
+                status_code=error_dict.get('status_code', 500),
+                detail=error_dict.get('detail', 'Internal server error')
+            )
+    
+    
+    @staticmethod
+    async def suggest_titles_func(user_id: UUID, prefix: str, limit: int = 10) -> TitleSuggestionsResponseSchema:
+        try:
+            if title_suggestions.enabled:
+                # served from memory; only a user's first lookup (or one after another worker's write) loads titles
+                suggestions = await title_suggestions.suggest(user_id, prefix, limit)
+            
+            else:
+                escaped = normalize_title(prefix).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                
+                statement = (
+                    select(Note.id, Note.title)
+                    .where(Note.user_id == user_id, Note.is_deleted == False, Note.title.ilike(f"{escaped}%"))
+                    .order_by(Note.title)
+                    .limit(limit)
+                )
+                
+                async with SessionLocal() as db:
+                    rows = (await db.execute(statement)).all()
+                
+                suggestions = [{'note_id': note_id, 'title': title} for note_id, title in rows]
+            
+            return TitleSuggestionsResponseSchema(
+                prefix=prefix,
+                suggestions=[TitleSuggestionSchema(**suggestion) for suggestion in suggestions]
+            )
+            
+        except SQLAlchemyError as e:
+            raise HTTPException(status_code=500, detail=f"Database error")
+            
+        except Exception as e:
+            error_dict = e.__dict__
+            
+            raise HTTPException(
+                status_code=error_dict.get('status_code', 500),
+                detail=error_dict.get('detail', 'Internal server error')
+            )
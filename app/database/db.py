@@ -4,6 +4,9 @@ from sqlalchemy.orm import declarative_base, sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 import os
 from dotenv import load_dotenv # type: ignore
+from utils.slow_query_log import slow_query_log_from_env
+from utils.request_timing import current_route
+from utils.query_budget import statement_timeout_for
 
 
 load_dotenv()
@@ -16,6 +19,12 @@ if not database_url:
 
 engine = create_async_engine(database_url)
 
+#opt-in: set SLOW_QUERY_MS to record statements slower than that many milliseconds
+slow_query_log = slow_query_log_from_env()
+
+if slow_query_log is not None:
+    slow_query_log.install(engine)
+
 Base = declarative_base()
 
 SessionLocal = sessionmaker(
@@ -26,7 +35,13 @@ SessionLocal = sessionmaker(
 
 
 async def connect_db() -> AsyncSession: # type: ignore
+    #declare this after the rate limit and auth dependencies so rejected requests never build a session;
+    #the session checks out a connection only on its first statement, and TimedRoute returns it
+    #as soon as the endpoint is done
     async with SessionLocal() as session:
+        #applied with SET LOCAL whenever the session begins a transaction (see install_statement_timeout_hook)
+        session.info['statement_timeout'] = statement_timeout_for(current_route.get())
+        
         try:
             yield session
             
@@ -0,0 +1,17 @@
+from fastapi import Header, HTTPException
+import hmac
+import os
+
+
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
+
+async def require_admin_token(x_admin_token: str = Header(None)):
+    #admin endpoints are disabled entirely unless ADMIN_TOKEN is configured
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail='Not found')
+    
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail='Invalid admin token')
+    
+    return
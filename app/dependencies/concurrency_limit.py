@@ -0,0 +1,38 @@
+from fastapi import HTTPException
+from utils.concurrency_limiter import concurrency_limiter, current_slot, ROUTE_PRIORITIES
+from utils.request_timing import current_route
+
+
+async def concurrency_limit():
+    #router-level dependency, so it runs before auth and rate limiting and sheds load at the cheapest point
+    priority = ROUTE_PRIORITIES.get(current_route.get(), 'normal')
+
+    if not concurrency_limiter.enabled or priority is None:
+        yield
+        return
+
+    slot = concurrency_limiter.try_acquire(priority)
+
+    if slot is None:
+        retry_after = concurrency_limiter.retry_after()
+
+        raise HTTPException(status_code=503, detail={
+                "error": "Server overloaded",
+                "message": "Too many requests in progress, try again shortly",
+                "retry_after": retry_after
+            },
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    current_slot.set(slot)
+    overloaded = False
+
+    try:
+        yield
+
+    except HTTPException as e:
+        overloaded = e.status_code in (503, 504)
+        raise
+
+    finally:
+        concurrency_limiter.release(slot, overloaded)
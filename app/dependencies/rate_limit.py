@@ -1,14 +1,21 @@
 from fastapi import Request, HTTPException, Depends
 import time
 from utils.rate_limiter import rate_limiter
+from utils.request_timing import current_timing
 
 
 async def rate_limit_20_per_minute(request: Request):
 
     max_requests = 20
     
+    started = time.perf_counter()
+    
     allowed, remaining, reset_time = await rate_limiter.is_allowed(request)
     
+    timing = current_timing.get()
+    if timing is not None:
+        timing.add('ratelimit', started)
+    
     if not allowed:
         retry_after = reset_time - int(time.time())
         
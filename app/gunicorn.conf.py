@@ -0,0 +1,12 @@
+import os
+
+
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+
+def child_exit(server, worker):
+    #prometheus multiprocess mode: drop an exited worker's livesum gauge files, otherwise its last
+    #values stay in every scrape. Imported here so the master never creates metric files of its own
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,69 @@
+"""
+Moves notes untouched for NOTE_ARCHIVE_AFTER_DAYS into the compressed note_archive table.
+
+Runs in batches of NOTE_ARCHIVE_BATCH_SIZE notes, one transaction each, skipping rows other
+transactions hold locked, so it can run next to live traffic (e.g. nightly from cron). Afterwards
+it reports the hot table's size against shared_buffers.
+
+    python -m jobs.archive_notes --after-days 180 --pause 0.2
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from database.db import SessionLocal, engine
+from utils.note_archive import note_archive
+
+
+async def report():
+    async with SessionLocal() as db:
+        row = (await db.execute(text(
+            "SELECT pg_table_size('notes'), pg_indexes_size('notes'), "
+            "pg_total_relation_size('note_archive'), current_setting('shared_buffers'), "
+            "(SELECT setting::bigint * current_setting('block_size')::bigint FROM pg_settings WHERE name = 'shared_buffers')"
+        ))).one()
+
+    notes_bytes, index_bytes, archive_bytes, shared_buffers, shared_buffers_bytes = row
+    mib = 1024 * 1024
+
+    print(f"notes: {notes_bytes / mib:.0f} MiB table + {index_bytes / mib:.0f} MiB indexes, archive: {archive_bytes / mib:.0f} MiB, shared_buffers: {shared_buffers}")
+
+    if notes_bytes + index_bytes > shared_buffers_bytes:
+        print("hot notes table and indexes are still larger than shared_buffers; consider a shorter --after-days")
+
+
+async def main(after_days: int, batch_size: int, pause: float, limit: int | None):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=after_days)
+    started = time.perf_counter()
+    moved = 0
+
+    try:
+        while limit is None or moved < limit:
+            async with SessionLocal() as db:
+                count = await note_archive.archive_batch(db, cutoff, batch_size if limit is None else min(batch_size, limit - moved))
+                await db.commit()
+
+            if not count:
+                break
+
+            moved += count
+            print(f"archived: {moved}  {time.perf_counter() - started:.1f}s", flush=True)
+            await asyncio.sleep(pause)
+
+        print(f"done: {moved} notes last updated before {cutoff.date()} archived")
+        await report()
+
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--after-days', type=int, default=note_archive.after_days, help='archive notes not updated for this many days')
+    parser.add_argument('--batch-size', type=int, default=note_archive.batch_size)
+    parser.add_argument('--pause', type=float, default=0.1, help='seconds to sleep between batches')
+    parser.add_argument('--limit', type=int, default=None, help='stop after this many notes')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.after_days, args.batch_size, args.pause, args.limit))
@@ -0,0 +1,102 @@
+"""
+Backfills note_daily_stats from existing notes and revisions.
+
+Live writes add to the rollup from the moment it is deployed, so the backfill counts only
+activity before --live-since (the deploy time, UTC). Days before it are rewritten; the deploy
+day itself holds live counts already, so the activity from earlier that day is added to them.
+It walks users in id order in batches, each in its own transaction; after an interruption,
+resume with --after-user from the last id it printed. Starting over would add the deploy
+day's early activity a second time (earlier days are simply rewritten).
+
+    python -m jobs.backfill_note_stats --live-since 2026-10-19T14:05:00 --batch-size 500
+
+Edits made before revision history existed are only known by a note's last updated_at,
+so their days are counted once at that date.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from uuid import UUID
+from sqlalchemy import select, text
+from database.db import SessionLocal, engine
+from models.auth_models import User
+
+
+BACKFILL_SQL = text("""
+    INSERT INTO note_daily_stats (user_id, day, created, updated, deleted)
+    SELECT user_id, (happened_at AT TIME ZONE 'UTC')::date AS day, sum(created), sum(updated), sum(deleted)
+    FROM (
+        SELECT user_id, created_at AS happened_at, 1 AS created, 0 AS updated, 0 AS deleted
+        FROM notes WHERE user_id = ANY(:user_ids)
+
+        UNION ALL
+
+        SELECT n.user_id, r.created_at, 0, 1, 0
+        FROM note_revisions r JOIN notes n ON n.id = r.note_id
+        WHERE n.user_id = ANY(:user_ids) AND r.version > 1
+
+        UNION ALL
+
+        SELECT n.user_id, n.updated_at, 0, 1, 0
+        FROM notes n
+        WHERE n.user_id = ANY(:user_ids) AND NOT n.is_deleted AND n.updated_at > n.created_at
+          AND NOT EXISTS (SELECT 1 FROM note_revisions r WHERE r.note_id = n.id AND r.version > 1)
+
+        UNION ALL
+
+        SELECT user_id, updated_at, 0, 0, 1
+        FROM notes WHERE user_id = ANY(:user_ids) AND is_deleted
+    ) activity
+    WHERE happened_at < :live_since
+    GROUP BY user_id, day
+    ON CONFLICT (user_id, day) DO UPDATE
+    SET created = excluded.created + CASE WHEN excluded.day = :live_day THEN note_daily_stats.created ELSE 0 END,
+        updated = excluded.updated + CASE WHEN excluded.day = :live_day THEN note_daily_stats.updated ELSE 0 END,
+        deleted = excluded.deleted + CASE WHEN excluded.day = :live_day THEN note_daily_stats.deleted ELSE 0 END
+""")
+
+
+def parse_utc(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+async def backfill(batch_size: int, live_since: datetime, after_user: UUID | None):
+    started = time.perf_counter()
+    users = 0
+
+    try:
+        while True:
+            async with SessionLocal() as db:
+                statement = select(User.id).order_by(User.id).limit(batch_size)
+
+                if after_user is not None:
+                    statement = statement.where(User.id > after_user)
+
+                user_ids = (await db.execute(statement)).scalars().all()
+
+                if not user_ids:
+                    break
+
+                await db.execute(BACKFILL_SQL, {'user_ids': list(user_ids), 'live_since': live_since, 'live_day': live_since.date()})
+                await db.commit()
+
+            users += len(user_ids)
+            after_user = user_ids[-1]
+            print(f"users: {users}  last id: {after_user}  {time.perf_counter() - started:.1f}s", flush=True)
+
+    finally:
+        await engine.dispose()
+
+    print(f"done: {users} users in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=500, help='users per transaction')
+    parser.add_argument('--live-since', type=parse_utc, required=True, help='when the rollup was deployed and live writes started counting, e.g. 2026-10-19T14:05:00 (UTC unless an offset is given)')
+    parser.add_argument('--after-user', type=UUID, default=None, help='resume after this user id')
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.batch_size, args.live_since, args.after_user))
@@ -2,9 +2,14 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException
 from utils.token_services import verify_token
 from jose.exceptions import JWTError, ExpiredSignatureError
+from utils.token_revocation import revocation_store
+from utils.request_timing import current_timing
+import time
 
 
 async def verify_authentication(token: str = Depends(OAuth2PasswordBearer(tokenUrl="login"))):
+    started = time.perf_counter()
+    
     try:
         payload = verify_token(token, 'access')
         
@@ -14,6 +19,12 @@ async def verify_authentication(token: str = Depends(OAuth2PasswordBearer(tokenU
                 detail='You are not authorized!',
                 headers={'WWW-Authenticated': 'Bearer'}
             )
+        elif revocation_store.is_revoked(payload.get('jti')):
+            raise HTTPException(
+                status_code=401,
+                detail='Token has been revoked',
+                headers={'WWW-Authenticated': 'Bearer'}
+            )
         else:
             return payload   
             
@@ -21,4 +32,9 @@ async def verify_authentication(token: str = Depends(OAuth2PasswordBearer(tokenU
         raise HTTPException(status_code=401, detail='Token has expired')
         
     except JWTError:
-        raise HTTPException(status_code=403, detail='Invalid token') 
\ No newline at end of file
+        raise HTTPException(status_code=403, detail='Invalid token') 
+    
+    finally:
+        timing = current_timing.get()
+        if timing is not None:
+            timing.add('auth', started)
\ No newline at end of file
@@ -0,0 +1,41 @@
+import time
+from utils.metrics import REQUEST_LATENCY, REQUESTS, REQUESTS_IN_FLIGHT
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware recording latency, status codes and in-flight requests per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] == '/metrics':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+
+        try:
+            await self.app(scope, receive, send_with_status)
+
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+
+            #use the matched route's template so note ids don't explode label cardinality
+            route = scope.get('route')
+            route_path = route.path if route is not None else 'unmatched'
+
+            REQUEST_LATENCY.labels(scope['method'], route_path).observe(time.perf_counter() - started)
+            REQUESTS.labels(scope['method'], route_path, str(status_code)).inc()
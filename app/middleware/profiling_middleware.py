@@ -0,0 +1,126 @@
+import time
+import os
+import hmac
+import random
+import cProfile
+from datetime import datetime
+from dependencies.admin import ADMIN_TOKEN
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:
+    Profiler = None
+
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+#oldest profiles are deleted beyond this, so sampling can't fill the disk
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 500))
+
+#one profiled request at a time per worker: cProfile is process-wide (a second enable() raises on
+#Python 3.12+ and hijacks the first profiler before that), and overlapping profiles mix requests
+_profiling_active = False
+
+
+class ProfilingMiddleware:
+    """
+    Runs a request under a profiler when it sends `X-Profile: 1` with a valid X-Admin-Token,
+    or when it is picked by PROFILE_SAMPLE_RATE. Output goes to PROFILE_DIR, tagged with route
+    and duration: speedscope JSON with pyinstrument installed (async-aware, so only this
+    request's await chain is attributed), otherwise a cProfile .prof file.
+
+    A request that arrives while another one is being profiled runs unprofiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+
+
+    def _should_profile(self, scope) -> bool:
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            return True
+
+        if not ADMIN_TOKEN:
+            return False
+
+        headers = dict(scope['headers'])
+
+        if headers.get(b'x-profile') != b'1':
+            return False
+
+        return hmac.compare_digest(headers.get(b'x-admin-token', b''), ADMIN_TOKEN.encode())
+
+
+    async def __call__(self, scope, receive, send):
+        global _profiling_active
+
+        if scope['type'] != 'http' or _profiling_active or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        _profiling_active = True
+        started = time.perf_counter()
+
+        if Profiler is not None:
+            profiler = Profiler(async_mode='enabled')
+            profiler.start()
+        else:
+            #cProfile sees every coroutine on the loop, so concurrent (unprofiled) requests still show up in it
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        try:
+            await self.app(scope, receive, send)
+
+        finally:
+            if Profiler is not None:
+                profiler.stop()
+            else:
+                profiler.disable()
+
+            _profiling_active = False
+            self._save(profiler, scope, (time.perf_counter() - started) * 1000)
+            self._prune()
+
+
+    def _save(self, profiler, scope, duration_ms: float):
+        route = scope.get('route')
+        route_name = route.name if route is not None else 'unmatched'
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        base = os.path.join(PROFILE_DIR, f"{stamp}-{scope['method']}-{route_name}-{duration_ms:.0f}ms")
+
+        try:
+            if Profiler is not None:
+                with open(f'{base}.speedscope.json', 'w') as f:
+                    f.write(profiler.output(renderer=SpeedscopeRenderer()))
+            else:
+                profiler.dump_stats(f'{base}.prof')
+
+        except Exception as e:
+            print(f"Saving profile failed: {e}")
+
+
+    def _prune(self):
+        try:
+            #names start with a timestamp, so sorting puts the oldest first
+            names = sorted(os.listdir(PROFILE_DIR))
+
+            for name in names[:max(0, len(names) - PROFILE_MAX_FILES)]:
+                os.remove(os.path.join(PROFILE_DIR, name))
+
+        except OSError as e:
+            print(f"Pruning profiles failed: {e}")
+
+
+def list_profiles(limit: int) -> list:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+
+    names = sorted(os.listdir(PROFILE_DIR), reverse=True)[:limit]
+
+    return [
+        {"file": name, "size": os.path.getsize(os.path.join(PROFILE_DIR, name))}
+        for name in names
+    ]
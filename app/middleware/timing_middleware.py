@@ -0,0 +1,59 @@
+import json
+import logging
+from utils.request_timing import RequestTiming, current_timing, SERVER_TIMING_HEADER, REQUEST_TIMING_LOG
+
+
+logger = logging.getLogger('request_timing')
+
+if REQUEST_TIMING_LOG and not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+
+class RequestTimingMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task overhead) that opens a RequestTiming
+    for each HTTP request, adds the Server-Timing header and logs the breakdown as JSON.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+                if SERVER_TIMING_HEADER:
+                    headers = list(message.get('headers', []))
+                    headers.append((b'server-timing', timing.header_value().encode()))
+                    message['headers'] = headers
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+
+        finally:
+            current_timing.reset(token)
+
+            if REQUEST_TIMING_LOG:
+                logger.info(json.dumps({
+                    'method': scope['method'],
+                    'path': scope['path'],
+                    'route': timing.route,
+                    'status': status_code,
+                    'statements': timing.statements,
+                    'timings_ms': {phase: round(duration, 3) for phase, duration in timing.breakdown().items()},
+                }))
@@ -1,16 +1,20 @@
 from database.db import Base
 from sqlalchemy.orm import Mapped, mapped_column
-from uuid import UUID as u, uuid4
+from uuid import UUID as u
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy import String, Integer
 from datetime import datetime
+from utils.uuid7 import uuid7
 
 
 class User(Base):
     __tablename__ = 'users'
     
-    id: Mapped[u] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    #time-ordered ids keep inserts at the right edge of the primary key; older uuid4 ids stay valid
+    id: Mapped[u] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     name: Mapped[str] = mapped_column(String, nullable=False)
+    #the unique constraint's btree (users_email_key) serves the signup ON CONFLICT and the login lookup,
+    #so users needs no other index; login only reads id and password from it
     email: Mapped[str] =  mapped_column(String, nullable=False, unique=True)
     password: Mapped[str] = mapped_column(String, nullable=False)
     profile_pic: Mapped[str | None] = mapped_column(String, nullable=True)
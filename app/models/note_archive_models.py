@@ -0,0 +1,62 @@
+from database.db import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Index, String, Text, DateTime, Integer, LargeBinary, Boolean
+from uuid import UUID as u
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy.sql import func
+
+
+class ArchivedNote(Base):
+    __tablename__ = 'note_archive'
+
+    #cold tier for notes untouched for a long time; same ids, content compressed (see utils/note_archive.py)
+    id: Mapped[u] = mapped_column(UUID(as_uuid=True), primary_key=True)
+
+    user_id: Mapped[u] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False
+    )
+
+    title: Mapped[str] = mapped_column(String(200), nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    codec: Mapped[str] = mapped_column(String(8), nullable=False)
+    content_is_null: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    tags: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=False, server_default='{}')
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    archived_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    #the only index: listings that include archived notes read a user's range off it
+    __table_args__ = (
+    Index('idx_note_archive_user_updated', 'user_id', 'updated_at'),
+    )
+
+    def __repr__(self):
+        return f"<ArchivedNote(id={self.id}, title='{self.title}', user_id={self.user_id})>"
+
+
+class ArchivedNoteRevision(Base):
+    __tablename__ = 'note_archive_revisions'
+
+    #note_revisions rows of an archived note, moved back unchanged when the note is restored
+    note_id: Mapped[u] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('note_archive.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    is_snapshot: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    base_version: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    title: Mapped[str] = mapped_column(String(200), nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    content_length: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<ArchivedNoteRevision(note_id={self.note_id}, version={self.version})>"
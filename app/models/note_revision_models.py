@@ -0,0 +1,35 @@
+from database.db import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Integer, String, Boolean, LargeBinary, DateTime
+from uuid import UUID as u
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+
+class NoteRevision(Base):
+    __tablename__ = 'note_revisions'
+
+    #the composite primary key doubles as the (note_id, version) lookup index
+    note_id: Mapped[u] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('notes.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    version: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    #snapshots hold the full compressed content, deltas are diffs against the snapshot at base_version
+    is_snapshot: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    base_version: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    title: Mapped[str] = mapped_column(String(200), nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    content_length: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"<NoteRevision(note_id={self.note_id}, version={self.version}, is_snapshot={self.is_snapshot})>"
@@ -0,0 +1,25 @@
+from database.db import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Integer, Date
+from uuid import UUID as u
+from datetime import date
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class NoteDailyStats(Base):
+    __tablename__ = 'note_daily_stats'
+
+    #one row per user per UTC day, upserted by every note write; the primary key serves range reads
+    user_id: Mapped[u] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('users.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+
+    created: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    updated: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+    deleted: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f"<NoteDailyStats(user_id={self.user_id}, day={self.day}, created={self.created}, updated={self.updated}, deleted={self.deleted})>"
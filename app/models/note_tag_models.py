@@ -0,0 +1,21 @@
+from database.db import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Integer, String
+from uuid import UUID as u
+from sqlalchemy.dialects.postgresql import UUID
+
+
+class NoteTagCount(Base):
+    __tablename__ = 'note_tag_counts'
+
+    #maintained by every note write so the tag facets never aggregate over notes
+    user_id: Mapped[u] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey('users.id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    tag: Mapped[str] = mapped_column(String(50), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<NoteTagCount(user_id={self.user_id}, tag='{self.tag}', count={self.count})>"
@@ -1,16 +1,18 @@
 from database.db import Base
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import ForeignKey, Index
-from uuid import UUID as u, uuid4
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import String, Text, DateTime, Boolean
+from uuid import UUID as u
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy import String, Text, DateTime, Boolean, Integer
 from sqlalchemy.sql import func
+from utils.uuid7 import uuid7
 
 
 class Note(Base):
     __tablename__ = 'notes'
     
-    id: Mapped[u] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    #time-ordered ids keep inserts at the right edge of the primary key; older uuid4 ids stay valid
+    id: Mapped[u] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     
     user_id: Mapped[u] = mapped_column(
         UUID(as_uuid=True), 
@@ -24,6 +26,12 @@ class Note(Base):
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=True)
     
+    #normalized by utils.note_tags; the GIN index below serves @> / && filters per user
+    tags: Mapped[list[str]] = mapped_column(ARRAY(Text), nullable=False, default=list, server_default='{}')
+    
+    #bumped on every edit; PATCH uses it for optimistic concurrency
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default='1')
+    
     created_at: Mapped[DateTime] = mapped_column(
         DateTime(timezone=True), 
         server_default=func.now()
@@ -39,6 +47,8 @@ class Note(Base):
     Index('idx_notes_user_title', 'user_id', 'title'),
     Index('idx_notes_user_created', 'user_id', 'created_at'),
     Index('idx_notes_user_active', 'user_id', 'is_deleted', 'updated_at'),
+    Index('idx_notes_user_tags', 'user_id', 'tags', postgresql_using='gin'),
+    Index('idx_notes_user_id', 'user_id', 'id'),
     )
     
     def __repr__(self):
@@ -0,0 +1,28 @@
+from database.db import Base
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, DateTime, Index
+from sqlalchemy.sql import func
+
+
+class RevokedToken(Base):
+    __tablename__ = 'revoked_tokens'
+    
+    jti: Mapped[str] = mapped_column(String(32), primary_key=True)
+    
+    #rows are only needed until the token would have expired anyway
+    expires_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+    
+    revoked_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    #workers poll for new revocations by revoked_at and prune by expires_at
+    __table_args__ = (
+    Index('idx_revoked_tokens_revoked_at', 'revoked_at'),
+    Index('idx_revoked_tokens_expires_at', 'expires_at'),
+    )
+    
+    def __repr__(self):
+        return f"<RevokedToken(jti={self.jti}, expires_at={self.expires_at})>"
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import FileResponse
+from database.db import slow_query_log
+from dependencies.admin import require_admin_token
+from middleware.profiling_middleware import PROFILE_DIR, list_profiles
+import os
+
+
+admin_router = APIRouter(
+    prefix='/api/admin',
+    tags=['Admin'],
+    dependencies=[Depends(require_admin_token)]
+)
+
+
+@admin_router.get('/slow-queries')
+async def slow_queries_route(limit: int = Query(20, ge=1, le=500, description="Number of fingerprints to return")):
+    """
+    Slowest SQL fingerprints seen by this worker.
+    
+    - Requires the X-Admin-Token header
+    - Empty unless SLOW_QUERY_MS is set
+    - Includes a sampled EXPLAIN plan per fingerprint when one was captured
+    """
+    if slow_query_log is None:
+        return {"enabled": False, "threshold_ms": None, "queries": [], "recent": []}
+    
+    return {
+        "enabled": True,
+        "threshold_ms": slow_query_log.threshold_ms,
+        "queries": slow_query_log.top(limit),
+        "recent": list(slow_query_log.recent)[-limit:]
+    }
+
+
+
+@admin_router.get('/profiles')
+async def list_profiles_route(limit: int = Query(50, ge=1, le=1000, description="Number of profiles to return")):
+    """
+    Most recent request profiles saved by this worker.
+    
+    - Requires the X-Admin-Token header
+    - Profile a request by sending `X-Profile: 1` with the admin token, or set PROFILE_SAMPLE_RATE
+    """
+    return {"profiles": list_profiles(limit)}
+
+
+@admin_router.get('/profiles/{name}')
+async def get_profile_route(name: str):
+    """
+    Download a saved profile (speedscope JSON or cProfile .prof).
+    
+    - Requires the X-Admin-Token header
+    """
+    path = os.path.join(PROFILE_DIR, os.path.basename(name))
+    
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    return FileResponse(path, filename=os.path.basename(name))
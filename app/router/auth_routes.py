@@ -5,11 +5,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from controllers.auth_controllers import AuthController
 from middleware.auth_middleware import verify_authentication
 from dependencies.rate_limit import rate_limit_20_per_minute
+from dependencies.concurrency_limit import concurrency_limit
+from utils.request_timing import TimedRoute
 
 
 auth_router = APIRouter(
     prefix='/api/auth',
-    tags=['Authentication']
+    tags=['Authentication'],
+    route_class=TimedRoute,
+    dependencies=[Depends(concurrency_limit)]
 )
 
 
@@ -29,10 +33,11 @@ async def login_route(request: Request, res: Response, data: UserLoginSchema, _
     """
     Authenticate user with email and password.
     
+    - Repeated failures for an email or IP are throttled with exponential backoff (429)
     - Sets refresh token as HTTP-only cookie
     - Returns access token in response body (to be stored in client state)
     """
-    return await AuthController.login_func(data, db, res)
+    return await AuthController.login_func(data, db, res, request)
 
     
 @auth_router.post('/refresh-access-token')
@@ -47,11 +52,12 @@ async def refresh_token_route(refreshToken: str = Cookie(None)):
   
   
 @auth_router.post('/logout')
-async def logout_route(res: Response, payload = Depends(verify_authentication)):
+async def logout_route(res: Response, refreshToken: str = Cookie(None), payload = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
     """
     Logout user and clear authentication tokens.
     
+    - Revokes the current access token and refresh token
     - Clears refresh token cookie
     - Requires valid access token in Authorization header
     """
-    return await AuthController.logout_user_func(res)
\ No newline at end of file
+    return await AuthController.logout_user_func(res, payload, refreshToken, db)
\ No newline at end of file
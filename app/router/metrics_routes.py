@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+from utils.metrics import render_metrics
+
+
+metrics_router = APIRouter(
+    tags=['Monitoring']
+)
+
+
+@metrics_router.get('/metrics', include_in_schema=False)
+async def metrics_route():
+    """
+    Prometheus metrics for this worker, or for all workers when PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -1,27 +1,50 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Header, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Optional, Literal
 from uuid import UUID
-from datetime import date
+from datetime import date, datetime, timedelta, timezone
 from database.db import connect_db
 from schemas.note_schemas import (
     NoteCreateSchema, 
     NoteUpdateSchema, 
     NoteResponseSchema, 
     NoteListResponseSchema,
-    NoteSearchSchema
+    NoteSearchSchema,
+    NotePatchSchema,
+    NotePatchResponseSchema,
+    NoteHistoryResponseSchema,
+    NoteRevisionContentSchema,
+    TagFacetsResponseSchema,
+    NoteStatsResponseSchema,
+    TitleSuggestionsResponseSchema
 )
 from middleware.auth_middleware import verify_authentication
 from controllers.notes_controllers import NoteController
+from controllers.note_feed_controllers import NoteFeedController
+from controllers.note_history_controllers import NoteHistoryController
 from dependencies.rate_limit import rate_limit_20_per_minute
+from dependencies.concurrency_limit import concurrency_limit
+from utils.request_timing import TimedRoute
+from utils.single_flight import read_coalescer
+from utils.result_cache import result_cache
+from utils.note_tags import normalize_tags
 
 
 note_router = APIRouter(
     prefix='/api/notes',
-    tags=['Notes']
+    tags=['Notes'],
+    route_class=TimedRoute,
+    dependencies=[Depends(concurrency_limit)]
 )
 
 
+def parse_tag_filter(tags: Optional[list[str]]) -> list[str]:
+    try:
+        return normalize_tags(tags)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @note_router.get('/search', response_model=NoteListResponseSchema)
 async def search_notes_route(
     request: Request,
@@ -39,46 +62,155 @@ async def search_notes_route(
         None,
         description="Filter notes created before this date (inclusive), format: YYYY-MM-DD"
     ),
+    tags: Optional[list[str]] = Query(None, description="Filter by tag (repeat for several)"),
+    tag_match: Literal['all', 'any'] = Query('all', description="`all` requires every tag, `any` at least one"),
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-    db: AsyncSession = Depends(connect_db),
     payload: dict = Depends(verify_authentication)
 ):
     """
     Search notes by:
     - Title (partial match, case-insensitive)
     - Created date range
+    - Tags
     
     Both parameters are optional. Use one or both.
     Returns paginated results.
+    Identical concurrent searches by the same user share one query,
+    and results are cached until the user's next note write.
     """
     user_id = payload.get('id')
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
-    if not title and not created_after and not created_before:
+    tags = parse_tag_filter(tags)
+    
+    if not title and not created_after and not created_before and not tags:
         raise HTTPException(
             status_code=400,
-            detail="At least one search parameter must be provided (title, created_after, or created_before)"
+            detail="At least one search parameter must be provided (title, created_after, created_before, or tags)"
         )
     
     filters = NoteSearchSchema(
         title=title,
         created_after=created_after,
-        created_before=created_before
+        created_before=created_before,
+        tags=tags,
+        tag_match=tag_match
     )
     
-    return await NoteController.search_notes_func(
-        user_id=UUID(user_id),
-        filters=filters,
-        db=db,
-        page=page,
-        page_size=page_size
-    )
+    async def search(session: AsyncSession) -> str:
+        result = await NoteController.search_notes_func(
+            user_id=UUID(user_id),
+            filters=filters,
+            db=session,
+            page=page,
+            page_size=page_size
+        )
+        return result.model_dump_json()
+    
+    # ILIKE is case-insensitive, so the title is normalized for the key
+    params = (title.strip().lower() if title else None, created_after, created_before, tuple(tags), tag_match, page, page_size)
+    
+    body = await result_cache.get_or_load(user_id, 'search', params, lambda: read_coalescer.run((user_id, result_cache.generation(user_id), 'search', params), search))
+    return Response(content=body, media_type='application/json')
+    
+
+@note_router.get('/tags', response_model=TagFacetsResponseSchema)
+async def tag_facets_route(request: Request, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
+    """
+    Tags used by the authenticated user with the number of active notes for each.
+    
+    - Requires authentication
+    - Sorted by count, most used first
+    - Served from counters kept up to date by note writes
+    """
+    user_id = payload.get('id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    return await NoteController.tag_facets_func(UUID(user_id), db)
+
+
+@note_router.get('/stats', response_model=NoteStatsResponseSchema)
+async def note_stats_route(
+    request: Request,
+    _ = Depends(rate_limit_20_per_minute),
+    start: Optional[date] = Query(None, description="First day (UTC, inclusive), defaults to a year before end"),
+    end: Optional[date] = Query(None, description="Last day (UTC, inclusive), defaults to today"),
+    payload: dict = Depends(verify_authentication)
+):
+    """
+    Notes created, updated and deleted per day, for activity charts.
+    
+    - Requires authentication
+    - Only days with activity are returned
+    - Served from a per-day rollup, so long ranges stay cheap
+    - Results are cached until the user's next note write
+    """
+    user_id = payload.get('id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=365)
+    
+    async def stats(session: AsyncSession) -> str:
+        result = await NoteController.stats_func(UUID(user_id), start, end, session)
+        return result.model_dump_json()
+    
+    params = (start, end)
+    
+    body = await result_cache.get_or_load(user_id, 'stats', params, lambda: read_coalescer.run((user_id, result_cache.generation(user_id), 'stats', params), stats))
+    return Response(content=body, media_type='application/json')
+
+
+@note_router.get('/suggest', response_model=TitleSuggestionsResponseSchema)
+async def suggest_titles_route(
+    request: Request,
+    prefix: str = Query(..., min_length=1, max_length=200, description="What the user has typed so far"),
+    limit: int = Query(10, ge=1, le=20, description="Maximum number of suggestions"),
+    payload: dict = Depends(verify_authentication)
+):
+    """
+    Title completions for a search box, one request per keystroke.
+    
+    - Requires authentication
+    - Matches the start of the title or of any word in it, case-insensitive
+    - Served from an in-memory index, so it is not counted against the 20/minute limit
+    """
+    user_id = payload.get('id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    return await NoteController.suggest_titles_func(UUID(user_id), prefix, limit)
+
+
+@note_router.get('/events')
+async def note_events_route(
+    request: Request,
+    _ = Depends(rate_limit_20_per_minute),
+    since: Optional[str] = Query(None, description="Resume after this watermark (the id of the last event received)"),
+    last_event_id: Optional[str] = Header(None),
+    payload: dict = Depends(verify_authentication)
+):
+    """
+    Server-Sent Events stream of the user's note changes.
+    
+    - Requires authentication
+    - Emits `created`, `updated` and `deleted` events, each with the note id and a watermark as the event id
+    - Reconnecting with `Last-Event-ID` (or `since`) replays everything missed in between; events just before it may be repeated
+    - Sends a heartbeat comment every few seconds; a `resync` event means the client should refetch its list
+    """
+    user_id = payload.get('id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
     
+    return await NoteFeedController.stream_func(UUID(user_id), last_event_id or since, request)
+
 
 @note_router.post('', response_model=NoteResponseSchema, status_code=201)
-async def create_note_route(request: Request, data: NoteCreateSchema, _ = Depends(rate_limit_20_per_minute),db: AsyncSession = Depends(connect_db), payload: dict = Depends(verify_authentication)):
+async def create_note_route(request: Request, data: NoteCreateSchema, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
     """
     Create a new note.
     
@@ -93,12 +225,13 @@ async def create_note_route(request: Request, data: NoteCreateSchema, _ = Depend
 
 
 @note_router.get('/{note_id}', response_model=NoteResponseSchema)
-async def get_note_route(request: Request, note_id: UUID, _ = Depends(rate_limit_20_per_minute), db: AsyncSession = Depends(connect_db), payload: dict = Depends(verify_authentication)):
+async def get_note_route(request: Request, note_id: UUID, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
     """
     Retrieve a single note by ID.
     
     - Requires authentication
     - User can only access their own notes
+    - Archived notes are returned too, marked `archived`
     """
     user_id = payload.get('id')
     
@@ -109,30 +242,50 @@ async def get_note_route(request: Request, note_id: UUID, _ = Depends(rate_limit
 
 
 @note_router.get('', response_model=NoteListResponseSchema)
-async def list_notes_route(request: Request, _ = Depends(rate_limit_20_per_minute),     page: int = Query(1, ge=1, description="Page number"), page_size: int = Query(10, ge=1, le=100, description="Items per page"), search: Optional[str] = Query(None, description="Search in title and content"), db: AsyncSession = Depends(connect_db), payload: dict = Depends(verify_authentication)):
+async def list_notes_route(request: Request, _ = Depends(rate_limit_20_per_minute),     page: int = Query(1, ge=1, description="Page number"), page_size: int = Query(10, ge=1, le=100, description="Items per page"), search: Optional[str] = Query(None, description="Search in title and content"), tags: Optional[list[str]] = Query(None, description="Filter by tag (repeat for several)"), tag_match: Literal['all', 'any'] = Query('all', description="`all` requires every tag, `any` at least one"), sort: Literal['updated', 'created'] = Query('updated', description="`updated` (most recently edited first) or `created` (newest first, cursor-paginated; notes created before ids became time-ordered UUIDv7 are in random order and can appear before or after newer notes)"), cursor: Optional[UUID] = Query(None, description="`next_cursor` from the previous page (sort=created only)"), include_archived: bool = Query(False, description="Also list archived notes (search matches only their titles)"), payload: dict = Depends(verify_authentication)):
     """
     List all notes for the authenticated user.
     
     - Requires authentication
     - Supports pagination
     - Supports search by title/content
+    - Supports filtering by tags
+    - With sort=created, pass `next_cursor` back as `cursor` for constant-cost deep pages (cursor pages skip the count, so `total` and `total_pages` are null)
+    - Notes moved to the archive are left out unless include_archived=true
     - Returns only user's own notes
+    - Identical concurrent requests by the same user share one query
+    - Results are cached until the user's next note write
     """
     user_id = payload.get('id')
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
     
-    return await NoteController.list_notes_func(
-        UUID(user_id), 
-        db, 
-        page, 
-        page_size, 
-        search
-    )
+    tags = parse_tag_filter(tags)
+    
+    async def list_notes(session: AsyncSession) -> str:
+        result = await NoteController.list_notes_func(
+            UUID(user_id), 
+            session, 
+            page, 
+            page_size, 
+            search,
+            tags,
+            tag_match,
+            sort,
+            cursor,
+            include_archived
+        )
+        return result.model_dump_json()
+    
+    params = (page, page_size, search or None, tuple(tags), tag_match, sort, cursor, include_archived)
+    
+    # the generation is part of the single-flight key so a read started before a write is never shared after it
+    body = await result_cache.get_or_load(user_id, 'list', params, lambda: read_coalescer.run((user_id, result_cache.generation(user_id), 'list', params), list_notes))
+    return Response(content=body, media_type='application/json')
 
 
 @note_router.put('/{note_id}', response_model=NoteResponseSchema)
-async def update_note_route(request: Request, note_id: UUID, data: NoteUpdateSchema, _ = Depends(rate_limit_20_per_minute), db: AsyncSession = Depends(connect_db), payload: dict = Depends(verify_authentication)):
+async def update_note_route(request: Request, note_id: UUID, data: NoteUpdateSchema, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
     """
     Update an existing note.
     
@@ -147,8 +300,71 @@ async def update_note_route(request: Request, note_id: UUID, data: NoteUpdateSch
     return await NoteController.update_note_func(note_id, data, UUID(user_id), db)
 
 
+@note_router.patch('/{note_id}', response_model=NotePatchResponseSchema)
+async def patch_note_route(request: Request, note_id: UUID, data: NotePatchSchema, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
+    """
+    Apply incremental edits to a note's content.
+    
+    - Requires authentication
+    - `ops` is a list of splice/append operations made against `base_version`
+    - Returns 409 with the current version if the note changed in between
+    - Returns the new version, not the content, so requests stay the size of the edit
+    """
+    user_id = payload.get('id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    return await NoteController.patch_note_func(note_id, data, UUID(user_id), db)
+
+
+@note_router.get('/{note_id}/history', response_model=NoteHistoryResponseSchema)
+async def note_history_route(request: Request, note_id: UUID, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
+    """
+    List the stored revisions of a note, newest first.
+    
+    - Requires authentication
+    - User can only see the history of their own notes
+    - Returns revision metadata only, not content
+    """
+    user_id = payload.get('id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    return await NoteHistoryController.history_func(note_id, UUID(user_id), db)
+
+
+@note_router.get('/{note_id}/history/{version}', response_model=NoteRevisionContentSchema)
+async def note_revision_route(request: Request, note_id: UUID, version: int, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
+    """
+    Get the title and content of a note as it was at a given version.
+    
+    - Requires authentication
+    - Returns 404 if the revision was pruned by the retention policy
+    """
+    user_id = payload.get('id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    return await NoteHistoryController.get_revision_func(note_id, version, UUID(user_id), db)
+
+
+@note_router.post('/{note_id}/history/{version}/restore', response_model=NoteResponseSchema)
+async def restore_note_revision_route(request: Request, note_id: UUID, version: int, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
+    """
+    Restore a note to an earlier version.
+    
+    - Requires authentication
+    - The restored content is saved as a new version, so the restore itself can be undone
+    """
+    user_id = payload.get('id')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    
+    return await NoteHistoryController.restore_revision_func(note_id, version, UUID(user_id), db)
+
+
 @note_router.delete('/{note_id}')
-async def delete_note_route(request: Request, note_id: UUID, _ = Depends(rate_limit_20_per_minute), db: AsyncSession = Depends(connect_db), payload: dict = Depends(verify_authentication)):
+async def delete_note_route(request: Request, note_id: UUID, _ = Depends(rate_limit_20_per_minute), payload: dict = Depends(verify_authentication), db: AsyncSession = Depends(connect_db)):
     """
     Soft delete a note.
     
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+from typing import Literal
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
 from datetime import date
+from utils.note_tags import normalize_tags
 
 
 class NoteBaseSchema(BaseModel):
@@ -11,17 +13,31 @@ class NoteBaseSchema(BaseModel):
 
 
 class NoteCreateSchema(NoteBaseSchema):
-    pass
+    tags: list[str] = Field(default_factory=list, description="Tags (case-insensitive, at most 20)")
+    
+    @field_validator('tags')
+    @classmethod
+    def validate_tags(cls, tags):
+        return normalize_tags(tags)
 
 
 class NoteUpdateSchema(BaseModel):
     title: Optional[str] = Field(None, min_length=1, max_length=200, description="Note title")
     content: Optional[str] = Field(None, description="Note content")
+    tags: Optional[list[str]] = Field(None, description="Replaces the note's tags")
+    
+    @field_validator('tags')
+    @classmethod
+    def validate_tags(cls, tags):
+        return None if tags is None else normalize_tags(tags)
 
 
 class NoteResponseSchema(NoteBaseSchema):
     id: UUID
     user_id: UUID
+    version: int
+    tags: list[str] = []
+    archived: bool = False
     created_at: datetime
     updated_at: datetime
     
@@ -31,10 +47,12 @@ class NoteResponseSchema(NoteBaseSchema):
 
 class NoteListResponseSchema(BaseModel):
     notes: list[NoteResponseSchema]
-    total: int
+    #None on cursor pages, which skip the COUNT(*); take them from the first page
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[UUID] = None
     
     
 class NoteSearchSchema(BaseModel):
@@ -43,4 +61,87 @@ class NoteSearchSchema(BaseModel):
     created_after: Optional[date] = Field(None, description="Filter notes created after this date (inclusive), format: YYYY-MM-DD"
     )
     created_before: Optional[date] = Field(None, description="Filter notes created before this date (inclusive), format: YYYY-MM-DD"
-    )
\ No newline at end of file
+    )
+    tags: list[str] = Field(default_factory=list, description="Filter by tags")
+    tag_match: Literal['all', 'any'] = Field('all', description="`all` requires every tag, `any` at least one")
+
+
+class NotePatchOperationSchema(BaseModel):
+    op: Literal['splice', 'append'] = Field(..., description="`splice` replaces `delete` characters at `offset` with `text`; `append` adds `text` at the end")
+    offset: Optional[int] = Field(None, ge=0, description="Character offset for splice, applied after the previous operations")
+    delete: int = Field(0, ge=0, description="Characters to remove at offset (splice only)")
+    text: str = Field('', description="Text to insert or append")
+
+
+class NotePatchSchema(BaseModel):
+    base_version: int = Field(..., ge=1, description="Version of the note the operations were made against")
+    ops: list[NotePatchOperationSchema] = Field(..., min_length=1, max_length=1000, description="Operations, applied in order")
+
+
+class NotePatchResponseSchema(BaseModel):
+    id: UUID
+    version: int
+    content_length: int
+    updated_at: datetime
+
+
+class NoteRevisionSchema(BaseModel):
+    version: int
+    title: str
+    content_length: int
+    is_snapshot: bool
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class NoteHistoryResponseSchema(BaseModel):
+    note_id: UUID
+    revisions: list[NoteRevisionSchema]
+
+
+class NoteRevisionContentSchema(BaseModel):
+    note_id: UUID
+    version: int
+    title: str
+    content: str
+
+
+class TagFacetSchema(BaseModel):
+    tag: str
+    count: int
+
+
+class TagFacetsResponseSchema(BaseModel):
+    tags: list[TagFacetSchema]
+
+
+class NoteDailyStatSchema(BaseModel):
+    day: date
+    created: int
+    updated: int
+    deleted: int
+    
+    class Config:
+        from_attributes = True
+
+
+class NoteStatsResponseSchema(BaseModel):
+    start: date
+    end: date
+    days: list[NoteDailyStatSchema]
+    total_created: int
+    total_updated: int
+    total_deleted: int
+    active_notes: int
+
+
+class TitleSuggestionSchema(BaseModel):
+    note_id: UUID
+    title: str
+
+
+class TitleSuggestionsResponseSchema(BaseModel):
+    prefix: str
+    suggestions: list[TitleSuggestionSchema]
@@ -1,9 +1,22 @@
 from fastapi import FastAPI, Depends
-from database.db import SessionLocal
+from database.db import SessionLocal, engine
 from sqlalchemy import text
 from router.auth_routes import auth_router
 from router.notes_routes import note_router
+from router.metrics_routes import metrics_router
+from router.admin_routes import admin_router
 from fastapi.middleware.cors import CORSMiddleware
+from utils.token_revocation import revocation_store
+from utils.request_timing import REQUEST_TIMING_ENABLED, install_sql_hooks, install_checkout_hooks
+from middleware.timing_middleware import RequestTimingMiddleware
+from middleware.metrics_middleware import MetricsMiddleware
+from middleware.profiling_middleware import ProfilingMiddleware, PROFILE_SAMPLE_RATE
+from dependencies.admin import ADMIN_TOKEN
+from utils.metrics import install_pool_metrics
+from utils.query_budget import install_statement_timeout_hook
+from utils.loop_watchdog import loop_watchdog
+from utils.note_feed import note_feed
+from utils.note_batcher import note_batcher
 
 
 app = FastAPI()
@@ -15,10 +28,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+#off by default; when disabled neither the middleware nor the SQL hooks are installed
+if REQUEST_TIMING_ENABLED:
+    install_sql_hooks(engine)
+    app.add_middleware(RequestTimingMiddleware)
+
+install_pool_metrics(engine)
+
+#pool waits feed the wait histogram, the checkout phase and the adaptive concurrency limit
+install_checkout_hooks()
+
+install_statement_timeout_hook()
+
+app.add_middleware(MetricsMiddleware)
+
+#profiling needs either an admin token (X-Profile header) or a sample rate
+if ADMIN_TOKEN or PROFILE_SAMPLE_RATE:
+    app.add_middleware(ProfilingMiddleware)
+
 @app.on_event("startup")
 async def startup_event():
+    loop_watchdog.start()
+    
+    note_batcher.start()
+    
     try:
         # print("Trying to connect...")    
 
@@ -26,10 +62,23 @@ async def startup_event():
             await session.execute(text("SELECT 1"))
 
         print("Database connected successfully.")
+        
+        revocation_store.start_sync()
+        
+        note_feed.start()
 
     except Exception as e:
         print(f"Database connection failed: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await note_batcher.stop()
+    
+    await note_feed.stop()
         
 
 app.include_router(auth_router)
 app.include_router(note_router)
+app.include_router(metrics_router)
+app.include_router(admin_router)
@@ -0,0 +1,104 @@
+import math
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from utils.metrics import CONCURRENCY_LIMIT, CONCURRENCY_IN_FLIGHT, CONCURRENCY_SHED
+
+
+#share of the limit each priority may fill, so lower priorities are shed first as the limit shrinks
+PRIORITY_SHARES: Dict[str, float] = {
+    'critical': 1.0,
+    'normal': 0.8,
+    'low': 0.5,
+}
+
+#routes not listed are 'normal'; None exempts a route (a long-lived stream would pin its slot)
+ROUTE_PRIORITIES: Dict[str, Optional[str]] = {
+    'get_note_route': 'critical',
+    'search_notes_route': 'low',
+    'tag_facets_route': 'low',
+    'note_stats_route': 'low',
+    'note_events_route': None,
+}
+
+
+class Slot:
+    __slots__ = ('admitted_at', 'grows_limit', 'pool_wait')
+
+    def __init__(self, admitted_at: float, grows_limit: bool):
+        self.admitted_at = admitted_at
+        self.grows_limit = grows_limit
+        self.pool_wait = 0.0
+
+
+#slot held by the current request, so the checkout hooks in request_timing can charge connection waits to it
+current_slot: ContextVar[Optional[Slot]] = ContextVar('current_slot', default=None)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on the number of requests this worker handles at once.
+
+    The limit shrinks by `backoff` when a request waited longer than `pool_wait_target` for a
+    pool connection or ended in a 503/504, the two signs that the database, not the route,
+    is the bottleneck. Raw latency isn't used: a healthy search is just slower than a healthy
+    get. Any other request grows the limit by 1/limit (about one slot per limit's worth of
+    requests, and only while the limit is actually in use). Only requests admitted after the
+    previous decrease can shrink it again, so a burst of slow requests costs one step instead
+    of collapsing the limit.
+
+    A request arriving while its priority's share of the limit is full is rejected at once
+    rather than queueing for a connection it would get too late to be useful.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('CONCURRENCY_LIMIT_ENABLED', 'false').lower() == 'true'
+        self.min_limit = int(os.getenv('CONCURRENCY_MIN_LIMIT', 5))
+        self.max_limit = int(os.getenv('CONCURRENCY_MAX_LIMIT', 200))
+        self.limit = float(os.getenv('CONCURRENCY_INITIAL_LIMIT', 100))
+        self.pool_wait_target = float(os.getenv('CONCURRENCY_POOL_WAIT_TARGET_MS', 20)) / 1000
+        self.backoff = float(os.getenv('CONCURRENCY_BACKOFF', 0.9))
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.smoothed_latency = 0.0
+        CONCURRENCY_LIMIT.set(self.limit)
+
+
+    def try_acquire(self, priority: str) -> Optional[Slot]:
+        #single-threaded event loop and no awaits here, so no lock is needed
+        if self.in_flight > 0 and self.in_flight >= self.limit * PRIORITY_SHARES[priority]:
+            CONCURRENCY_SHED.labels(priority).inc()
+            return None
+
+        self.in_flight += 1
+        CONCURRENCY_IN_FLIGHT.inc()
+
+        return Slot(time.perf_counter(), grows_limit=self.in_flight >= self.limit / 2)
+
+
+    def release(self, slot: Slot, overloaded: bool = False):
+        self.in_flight -= 1
+        CONCURRENCY_IN_FLIGHT.dec()
+
+        now = time.perf_counter()
+        latency = now - slot.admitted_at
+        self.smoothed_latency = latency if not self.smoothed_latency else 0.9 * self.smoothed_latency + 0.1 * latency
+
+        if overloaded or slot.pool_wait > self.pool_wait_target:
+            if slot.admitted_at > self.last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self.last_decrease = now
+
+        elif slot.grows_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+        CONCURRENCY_LIMIT.set(self.limit)
+
+
+    def retry_after(self) -> int:
+        #roughly how long the requests holding slots now will take to drain
+        return max(1, math.ceil(self.smoothed_latency))
+
+
+concurrency_limiter = AdaptiveConcurrencyLimiter()
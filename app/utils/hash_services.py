@@ -1,4 +1,8 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+from utils.metrics import BCRYPT_QUEUE_DEPTH
 
 
 pwd_context = CryptContext(
@@ -13,4 +17,40 @@ def hash_password_func(password: str):
 
 def verify_password(plain_password: str, secret_password: str):
     is_match = pwd_context.verify(plain_password, secret_password)
-    return is_match
\ No newline at end of file
+    return is_match
+
+
+# a real bcrypt hash of a random value, used so unknown emails cost the same as a wrong password
+_dummy_hash = pwd_context.hash('dummy-password-for-timing')
+
+
+def dummy_verify_password(plain_password: str):
+    pwd_context.verify(plain_password, _dummy_hash)
+    return False
+
+
+
+#bcrypt releases the GIL, so running it on a small pool keeps it off the event loop
+bcrypt_pool = ThreadPoolExecutor(max_workers=int(os.getenv('BCRYPT_POOL_SIZE', 4)), thread_name_prefix='bcrypt')
+
+
+async def _run_in_bcrypt_pool(func, *args):
+    BCRYPT_QUEUE_DEPTH.inc()
+    
+    try:
+        return await asyncio.get_running_loop().run_in_executor(bcrypt_pool, func, *args)
+    
+    finally:
+        BCRYPT_QUEUE_DEPTH.dec()
+
+
+async def hash_password_async(password: str):
+    return await _run_in_bcrypt_pool(hash_password_func, password)
+
+
+async def verify_password_async(plain_password: str, secret_password: str):
+    return await _run_in_bcrypt_pool(verify_password, plain_password, secret_password)
+
+
+async def dummy_verify_password_async(plain_password: str):
+    return await _run_in_bcrypt_pool(dummy_verify_password, plain_password)
@@ -0,0 +1,95 @@
+import time
+import asyncio
+import os
+from fastapi import Request
+from typing import Dict, Tuple
+
+
+class LoginThrottle:
+    """
+    Tracks failed logins per email and per client IP so that known-bad traffic
+    is rejected with a dict lookup before any bcrypt work is done.
+
+    After `free_attempts` failures a key is locked out for base_delay * 2^(n - free_attempts)
+    seconds, capped at max_delay. A successful login clears the email counter.
+    """
+
+    def __init__(self):
+        # key -> (failure_count, blocked_until, last_failure)
+        self.failures: Dict[str, Tuple[int, float, float]] = {}
+        self.free_attempts = int(os.getenv('LOGIN_FREE_ATTEMPTS', 5))
+        # an IP can front many legitimate users (NAT, offices), so it gets a larger allowance
+        self.ip_free_attempts = int(os.getenv('LOGIN_IP_FREE_ATTEMPTS', 20))
+        self.base_delay = float(os.getenv('LOGIN_BASE_DELAY', 1))
+        self.max_delay = float(os.getenv('LOGIN_MAX_DELAY', 900))
+        self.forget_after = 60 * 60
+        self._cleanup_task = None
+
+
+    def _start_cleanup_task(self):
+        if self._cleanup_task is not None:
+            return
+
+        async def cleanup():
+            while True:
+                await asyncio.sleep(300)
+                self._clean_old_failures()
+
+        self._cleanup_task = asyncio.create_task(cleanup())
+
+
+    def _clean_old_failures(self):
+        cutoff = time.time() - self.forget_after
+
+        keys_to_delete = [key for key, (_, blocked_until, last) in self.failures.items() if last < cutoff and blocked_until < cutoff]
+
+        for key in keys_to_delete:
+            del self.failures[key]
+
+
+    @staticmethod
+    def _keys(email: str, request: Request) -> Tuple[str, str]:
+        client = request.client
+        ip_address = client.host if client else "unknown"
+        return f"email:{email.lower()}", f"ip:{ip_address}"
+
+
+    def check(self, email: str, request: Request) -> int:
+        """Returns 0 if the attempt may proceed, otherwise the seconds to wait."""
+        now = time.time()
+        retry_after = 0
+
+        for key in self._keys(email, request):
+            entry = self.failures.get(key)
+
+            if entry and entry[1] > now:
+                retry_after = max(retry_after, int(entry[1] - now) + 1)
+
+        return retry_after
+
+
+    def record_failure(self, email: str, request: Request):
+        self._start_cleanup_task()
+        now = time.time()
+
+        for key in self._keys(email, request):
+            count, _, _ = self.failures.get(key, (0, 0.0, 0.0))
+            count += 1
+
+            free_attempts = self.free_attempts if key.startswith('email:') else self.ip_free_attempts
+            blocked_until = 0.0
+
+            if count >= free_attempts:
+                #a concurrent burst can push count far past free_attempts; a float overflows at 2 ** 1024
+                delay = min(self.base_delay * (2 ** min(count - free_attempts, 30)), self.max_delay)
+                blocked_until = now + delay
+
+            self.failures[key] = (count, blocked_until, now)
+
+
+    def record_success(self, email: str, request: Request):
+        email_key, _ = self._keys(email, request)
+        self.failures.pop(email_key, None)
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,151 @@
+import time
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import traceback
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+from utils.metrics import EVENT_LOOP_LAG
+
+
+logger = logging.getLogger('loop_watchdog')
+
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+
+class LoopBlockedError(AssertionError):
+    def __init__(self, blocked_ms: float, budget_ms: float, blocks: list):
+        self.blocked_ms = blocked_ms
+        self.budget_ms = budget_ms
+        self.blocks = blocks
+        super().__init__(f"event loop blocked for {blocked_ms:.1f}ms (budget {budget_ms:.1f}ms)")
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop lag with a heartbeat task and, when LOOP_BLOCK_THRESHOLD_MS is set,
+    runs a watchdog thread that notices a missed heartbeat while the loop is still blocked.
+    It then captures the loop thread's stack, so the report shows the sync code doing the
+    blocking (bcrypt, jose, a big Pydantic validation) and the route it was serving.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        threshold = os.getenv('LOOP_BLOCK_THRESHOLD_MS')
+        self.threshold_ms: Optional[float] = float(threshold) if threshold else None
+        self.blocks = deque(maxlen=100)
+        self.last_beat = time.monotonic()
+        self.loop = None
+        self.loop_thread_id = None
+        self._current_block: Optional[dict] = None
+        self._budget_windows = []
+        self._task = None
+        self._thread = None
+
+
+    def start(self):
+        if self._task is not None:
+            return
+
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._heartbeat())
+
+        if self.threshold_ms is not None:
+            self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self._thread.start()
+
+
+    async def _heartbeat(self):
+        while True:
+            expected = self.loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+
+            lag = max(0.0, self.loop.time() - expected)
+            self.last_beat = time.monotonic()
+
+            EVENT_LOOP_LAG.observe(lag)
+
+            for window in self._budget_windows:
+                window['max_lag_ms'] = max(window['max_lag_ms'], lag * 1000)
+
+            block = self._current_block
+
+            if block is not None:
+                #the watchdog saw the block begin; now we know how long it actually lasted
+                self._current_block = None
+                block['blocked_ms'] = round(lag * 1000, 3)
+                logger.warning(json.dumps(block))
+
+
+    def _watch(self):
+        while True:
+            time.sleep(self.interval / 2)
+
+            stalled_ms = (time.monotonic() - self.last_beat - self.interval) * 1000
+
+            if stalled_ms >= self.threshold_ms and self._current_block is None:
+                self._current_block = self._capture(stalled_ms)
+                self.blocks.append(self._current_block)
+
+                for window in self._budget_windows:
+                    window['blocks'].append(self._current_block)
+
+
+    def _capture(self, stalled_ms: float) -> dict:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+
+        route = None
+        while frame is not None:
+            #route handlers are named *_route by convention in router/
+            if frame.f_code.co_name.endswith('_route') and 'router' in frame.f_code.co_filename:
+                route = frame.f_code.co_name
+                break
+
+            frame = frame.f_back
+
+        task = asyncio.current_task(self.loop)
+        coroutine = task.get_coro().__qualname__ if task is not None else None
+
+        return {
+            'event': 'event_loop_blocked',
+            'route': route,
+            'coroutine': coroutine,
+            'blocked_ms': round(stalled_ms, 3),
+            'stack': [line.strip() for line in stack[-15:]],
+            'at': time.time(),
+        }
+
+
+    @asynccontextmanager
+    async def block_budget(self, budget_ms: float):
+        """
+        Debug mode for tests and benchmarks: raises LoopBlockedError on exit if the loop
+        was blocked for longer than `budget_ms` anywhere inside the block.
+        """
+        self.start()
+        window = {'max_lag_ms': 0.0, 'blocks': []}
+        self._budget_windows.append(window)
+
+        try:
+            yield window
+
+            #one more beat so a block right at the end is measured
+            await asyncio.sleep(self.interval * 2)
+
+        finally:
+            self._budget_windows.remove(window)
+
+        if window['max_lag_ms'] > budget_ms:
+            raise LoopBlockedError(window['max_lag_ms'], budget_ms, window['blocks'])
+
+
+loop_watchdog = LoopWatchdog()
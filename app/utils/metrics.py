@@ -0,0 +1,80 @@
+import os
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+
+#set PROMETHEUS_MULTIPROC_DIR (and clear it on deploy) when running several gunicorn/uvicorn workers
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by route',
+    ['method', 'route'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS = Counter('http_requests_total', 'Requests by route and status code', ['method', 'route', 'status'])
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'Requests currently being handled', multiprocess_mode='livesum')
+
+DB_POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections currently checked out of the pool', multiprocess_mode='livesum')
+DB_POOL_CHECKOUTS = Counter('db_pool_checkouts_total', 'Connections checked out of the pool')
+DB_POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time from a session\'s first statement until it holds a connection',
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+
+RATE_LIMIT_DECISIONS = Counter('rate_limit_decisions_total', 'Rate limiter decisions', ['decision'])
+RATE_LIMIT_KEYS = Gauge('rate_limit_keys', 'Keys tracked by the rate limiter', multiprocess_mode='livesum')
+RATE_LIMIT_LOCK_WAIT = Histogram(
+    'rate_limit_lock_wait_seconds',
+    'Time spent waiting for the rate limiter lock',
+    buckets=(0.00001, 0.0001, 0.001, 0.01, 0.1, 1)
+)
+
+BCRYPT_QUEUE_DEPTH = Gauge('bcrypt_pool_queue_depth', 'Password hash/verify jobs queued or running', multiprocess_mode='livesum')
+
+SINGLE_FLIGHT_REQUESTS = Counter('single_flight_requests_total', 'Coalesced reads: leaders ran the query, followers shared it', ['role'])
+
+RESULT_CACHE_REQUESTS = Counter('result_cache_requests_total', 'List/search result cache lookups', ['route', 'result'])
+RESULT_CACHE_BYTES = Gauge('result_cache_bytes', 'Bytes held by the in-memory result cache', multiprocess_mode='livesum')
+RESULT_CACHE_EVICTIONS = Counter('result_cache_evictions_total', 'Entries evicted from the result cache to stay under its size bound')
+
+NOTE_GROUP_COMMIT_BATCH = Histogram(
+    'note_group_commit_batch_size',
+    'Notes inserted per group-commit transaction',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500)
+)
+
+CONCURRENCY_LIMIT = Gauge('adaptive_concurrency_limit', 'Current adaptive concurrency limit', multiprocess_mode='livesum')
+CONCURRENCY_IN_FLIGHT = Gauge('adaptive_concurrency_in_flight', 'Requests holding a concurrency limiter slot', multiprocess_mode='livesum')
+CONCURRENCY_SHED = Counter('adaptive_concurrency_shed_total', 'Requests rejected with 503 by the concurrency limiter', ['priority'])
+
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'How late the event loop woke up a sleeping task',
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+)
+
+
+def render_metrics() -> tuple:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def install_pool_metrics(engine):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+        DB_POOL_CHECKOUTS.inc()
+
+    @event.listens_for(sync_engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
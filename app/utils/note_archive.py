@@ -0,0 +1,165 @@
+import os
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.notes_models import Note
+from models.note_archive_models import ArchivedNote, ArchivedNoteRevision
+from models.note_revision_models import NoteRevision
+from utils.note_feed import note_feed
+from utils.note_tags import adjust_tag_counts
+
+try:
+    import zstandard # type: ignore
+except ImportError:
+    zstandard = None
+
+
+def compress_content(content: Optional[str]) -> tuple:
+    """Returns (codec, data); zstd when the zstandard package is installed, zlib otherwise."""
+    raw = (content or '').encode()
+
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(raw)
+
+    return 'zlib', zlib.compress(raw, 9)
+
+
+def decompress_content(codec: str, data: bytes) -> str:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("note archived with zstd but the zstandard package is not installed")
+
+        return zstandard.ZstdDecompressor().decompress(data).decode()
+
+    return zlib.decompress(data).decode()
+
+
+def archived_content(row) -> Optional[str]:
+    return None if row.content_is_null else decompress_content(row.codec, row.data)
+
+
+REVISION_COLUMNS = ['note_id', 'version', 'is_snapshot', 'base_version', 'title', 'data', 'content_length', 'created_at']
+
+
+class NoteArchive:
+    """
+    Moves notes nobody has touched for `after_days` out of the hot notes table (and its
+    indexes) into note_archive, compressed. Reads by id fall back to the archive, and any
+    write to an archived note moves it back first, so callers never see the tier.
+
+    Soft-deleted notes stay where they are. A note's revisions move with it into
+    note_archive_revisions and come back on restore. Tag facet counts follow the default
+    listing, which leaves archived notes out.
+    """
+
+    def __init__(self):
+        self.after_days = int(os.getenv('NOTE_ARCHIVE_AFTER_DAYS', 180))
+        self.batch_size = int(os.getenv('NOTE_ARCHIVE_BATCH_SIZE', 1000))
+
+
+    async def archive_batch(self, db: AsyncSession, cutoff: datetime, limit: int) -> int:
+        """Archives up to `limit` cold notes in the caller's transaction; returns how many moved."""
+        statement = (
+            select(Note)
+            .where(Note.updated_at < cutoff, Note.is_deleted == False)
+            .order_by(Note.updated_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        notes = (await db.execute(statement)).scalars().all()
+
+        if not notes:
+            return 0
+
+        rows = []
+
+        for note in notes:
+            codec, data = compress_content(note.content)
+            rows.append({
+                'id': note.id,
+                'user_id': note.user_id,
+                'title': note.title,
+                'data': data,
+                'codec': codec,
+                'content_is_null': note.content is None,
+                'tags': note.tags,
+                'version': note.version,
+                'created_at': note.created_at,
+                'updated_at': note.updated_at,
+            })
+
+        ids = [note.id for note in notes]
+
+        await db.execute(insert(ArchivedNote), rows)
+        await db.execute(insert(ArchivedNoteRevision).from_select(
+            REVISION_COLUMNS,
+            select(*(getattr(NoteRevision, column) for column in REVISION_COLUMNS)).where(NoteRevision.note_id.in_(ids))
+        ))
+
+        removed_tags = defaultdict(list)
+
+        for note in notes:
+            removed_tags[note.user_id].extend(note.tags)
+
+        #one upsert per user; sorted so concurrent batches lock counters in the same order
+        for owner in sorted(removed_tags):
+            await adjust_tag_counts(db, owner, removed=removed_tags[owner])
+
+        #only invalidates other workers' cached pages; SSE clients aren't told (see NoteFeed._dispatch).
+        #sent before the delete, while the rows are still there to build the payload from
+        await note_feed.publish_many(db, ids, 'archived')
+        #note_revisions cascades from notes, after the copy above
+        await db.execute(delete(Note).where(Note.id.in_(ids)).execution_options(synchronize_session=False))
+
+        return len(ids)
+
+
+    async def get(self, db: AsyncSession, note_id: UUID, user_id: UUID):
+        statement = select(ArchivedNote).where(ArchivedNote.id == note_id, ArchivedNote.user_id == user_id)
+        return (await db.execute(statement)).scalar_one_or_none()
+
+
+    async def restore(self, db: AsyncSession, note_id: UUID, user_id: UUID) -> bool:
+        """Moves an archived note back into notes within the caller's transaction, ready to be written."""
+        statement = (
+            select(ArchivedNote)
+            .where(ArchivedNote.id == note_id, ArchivedNote.user_id == user_id)
+            .with_for_update()
+        )
+
+        archived = (await db.execute(statement)).scalar_one_or_none()
+
+        if archived is None:
+            return False
+
+        await db.execute(insert(Note).values(
+            id=archived.id,
+            user_id=archived.user_id,
+            title=archived.title,
+            content=archived_content(archived),
+            tags=archived.tags,
+            version=archived.version,
+            is_deleted=False,
+            created_at=archived.created_at,
+            updated_at=archived.updated_at
+        ))
+
+        await db.execute(insert(NoteRevision).from_select(
+            REVISION_COLUMNS,
+            select(*(getattr(ArchivedNoteRevision, column) for column in REVISION_COLUMNS)).where(ArchivedNoteRevision.note_id == note_id)
+        ))
+
+        await adjust_tag_counts(db, archived.user_id, added=archived.tags)
+
+        #cascades to note_archive_revisions, now copied back
+        await db.execute(delete(ArchivedNote).where(ArchivedNote.id == note_id))
+
+        return True
+
+
+note_archive = NoteArchive()
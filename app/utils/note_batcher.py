@@ -0,0 +1,165 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException
+from sqlalchemy import insert
+from database.db import SessionLocal
+from models.notes_models import Note
+from schemas.note_schemas import NoteCreateSchema, NoteResponseSchema
+from utils.note_feed import note_feed
+from utils.metrics import NOTE_GROUP_COMMIT_BATCH
+from utils.result_cache import result_cache
+from utils.uuid7 import uuid7
+from utils.title_suggestions import title_suggestions
+from utils.note_history import note_history
+from utils.note_tags import adjust_tag_counts
+from utils.note_stats import record_activity
+
+
+class NoteBatcher:
+    """
+    Group commit for note creation. Concurrent creates are queued and flushed as one
+    multi-row INSERT in a single transaction once `max_rows` are waiting or `max_delay_ms`
+    has passed since the first one, so many notes share one commit (and one fsync).
+
+    Every caller still gets its own NoteResponseSchema or error. If a batch fails, its rows
+    are retried one by one so a single bad row only fails its own request.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('NOTE_GROUP_COMMIT', 'false').lower() == 'true'
+        self.max_rows = int(os.getenv('NOTE_GROUP_COMMIT_MAX_ROWS', 100))
+        self.max_delay = float(os.getenv('NOTE_GROUP_COMMIT_MAX_DELAY_MS', 5)) / 1000
+        self.queue: Optional[asyncio.Queue] = None
+        self._task = None
+        self._closing = False
+
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+
+        #bounded so a stalled database pushes back on callers instead of buffering forever
+        self.queue = asyncio.Queue(maxsize=self.max_rows * 10)
+        self._task = asyncio.create_task(self._run())
+
+
+    async def submit(self, data: NoteCreateSchema, user_id: UUID) -> NoteResponseSchema:
+        if self._closing or self.queue is None:
+            raise HTTPException(status_code=503, detail="Server is shutting down")
+
+        future = asyncio.get_running_loop().create_future()
+        row = {'id': uuid7(), 'user_id': user_id, 'title': data.title, 'content': data.content, 'tags': data.tags, 'is_deleted': False}
+
+        await self.queue.put((row, future))
+        return await future
+
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            item = await self.queue.get()
+
+            if item is None:
+                return
+
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            stop = False
+
+            while len(batch) < self.max_rows:
+                timeout = deadline - loop.time()
+
+                if timeout <= 0:
+                    break
+
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+                if item is None:
+                    stop = True
+                    break
+
+                batch.append(item)
+
+            await self._flush(batch)
+
+            if stop:
+                return
+
+
+    async def _insert(self, entries: List[Tuple[dict, asyncio.Future]]):
+        async with SessionLocal() as db:
+            try:
+                #ORM bulk insert with RETURNING is sent as a single multi-row INSERT (insertmanyvalues)
+                result = await db.scalars(insert(Note).returning(Note), [row for row, _ in entries])
+                notes = {note.id: note for note in result.all()}
+
+                by_user = {}
+                
+                for note in notes.values():
+                    by_user.setdefault(note.user_id, []).append(note)
+                
+                for user_id, user_notes in by_user.items():
+                    await adjust_tag_counts(db, user_id, added=[tag for note in user_notes for tag in note.tags])
+                    await record_activity(db, user_id, created=len(user_notes))
+                
+                await note_history.record_snapshots(db, list(notes.values()))
+                await note_feed.publish_many(db, list(notes), 'created')
+                await db.commit()
+
+            except Exception:
+                await db.rollback()
+                raise
+
+        for row, future in entries:
+            previous_generation = result_cache.bump(row['user_id'])
+            title_suggestions.note_written(row['user_id'], previous_generation, row['id'], row['title'])
+
+            if not future.done():
+                future.set_result(NoteResponseSchema.model_validate(notes[row['id']]))
+
+
+    async def _flush(self, batch: List[Tuple[dict, asyncio.Future]]):
+        NOTE_GROUP_COMMIT_BATCH.observe(len(batch))
+
+        try:
+            await self._insert(batch)
+            return
+
+        except Exception:
+            if len(batch) == 1:
+                self._fail(batch)
+                return
+
+        for entry in batch:
+            try:
+                await self._insert([entry])
+
+            except Exception:
+                self._fail([entry])
+
+
+    @staticmethod
+    def _fail(entries: List[Tuple[dict, asyncio.Future]]):
+        for _, future in entries:
+            if not future.done():
+                future.set_exception(HTTPException(status_code=500, detail="Database error"))
+
+
+    async def stop(self):
+        """Stops accepting notes and flushes everything already queued."""
+        if self._task is None:
+            return
+
+        self._closing = True
+        await self.queue.put(None)
+        await self._task
+        self._task = None
+
+
+note_batcher = NoteBatcher()
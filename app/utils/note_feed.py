@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+from collections import defaultdict
+from typing import Dict, Set
+from uuid import UUID, uuid4
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.result_cache import result_cache
+from utils.title_suggestions import title_suggestions
+
+
+NOTE_FEED_CHANNEL = 'note_changes'
+
+#tags this worker's notifications; Postgres delivers a NOTIFY to the sending session's listener too
+WORKER_ID = uuid4().hex
+
+
+class FeedSubscriber:
+    """One connected client. The queue is bounded; a slow client gets a resync instead of unbounded buffering."""
+
+    def __init__(self, user_id: str, max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+
+    def push(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+
+        except asyncio.QueueFull:
+            #drop everything buffered; the stream will catch up from its watermark instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+
+            self.queue.put_nowait({'type': 'resync'})
+
+
+class NoteFeed:
+    """
+    Per-process fan-out of note change events.
+
+    Writers call publish() inside their transaction, so Postgres delivers the NOTIFY only if
+    the write commits. Each worker holds a single LISTEN connection and dispatches to its
+    local subscribers by user id, so connected clients cost a queue each, not a DB connection.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('NOTE_FEED_ENABLED', 'true').lower() == 'true'
+        self.max_queue = int(os.getenv('NOTE_FEED_MAX_QUEUE', 100))
+        self.subscribers: Dict[str, Set[FeedSubscriber]] = defaultdict(set)
+        self._task = None
+        self._connection = None
+
+
+    @staticmethod
+    async def publish(db: AsyncSession, note_id: UUID, op: str):
+        if not note_feed.enabled:
+            return
+
+        statement = text(
+            "SELECT pg_notify(:channel, json_build_object("
+            "'user_id', user_id, 'note_id', id, 'op', CAST(:op AS text), 'ts', updated_at, 'version', version, 'worker', CAST(:worker AS text))::text) "
+            "FROM notes WHERE id = :note_id"
+        )
+
+        await db.execute(statement, {'channel': NOTE_FEED_CHANNEL, 'op': op, 'note_id': note_id, 'worker': WORKER_ID})
+
+
+    @staticmethod
+    async def publish_many(db: AsyncSession, note_ids: list, op: str):
+        if not note_feed.enabled or not note_ids:
+            return
+
+        statement = text(
+            "SELECT pg_notify(:channel, json_build_object("
+            "'user_id', user_id, 'note_id', id, 'op', CAST(:op AS text), 'ts', updated_at, 'version', version, 'worker', CAST(:worker AS text))::text) "
+            "FROM notes WHERE id = ANY(:note_ids)"
+        )
+
+        await db.execute(statement, {'channel': NOTE_FEED_CHANNEL, 'op': op, 'note_ids': note_ids, 'worker': WORKER_ID})
+
+
+    def subscribe(self, user_id: str) -> FeedSubscriber:
+        subscriber = FeedSubscriber(user_id, self.max_queue)
+        self.subscribers[user_id].add(subscriber)
+        return subscriber
+
+
+    def unsubscribe(self, subscriber: FeedSubscriber):
+        subscribers = self.subscribers.get(subscriber.user_id)
+
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+
+            if not subscribers:
+                del self.subscribers[subscriber.user_id]
+
+
+    def _dispatch(self, connection, pid, channel, payload: str):
+        event = json.loads(payload)
+
+        #writes made by other workers invalidate this worker's cached results for the user;
+        #our own were already applied after commit, and bumping again would orphan the title index
+        if event.pop('worker', None) != WORKER_ID:
+            result_cache.bump(event['user_id'])
+
+        #archiving is a storage detail: reads fall back to the archive, so clients have nothing to react to
+        if event['op'] == 'archived':
+            return
+
+        for subscriber in self.subscribers.get(event['user_id'], ()):
+            subscriber.push({'type': 'change', **event})
+
+
+    def _resync_all(self):
+        #title indexes are only kept current by notifications, and some may have been missed
+        title_suggestions.clear()
+
+        for subscribers in self.subscribers.values():
+            for subscriber in subscribers:
+                subscriber.push({'type': 'resync'})
+
+
+    def start(self):
+        if not self.enabled or self._task is not None:
+            return
+
+        async def listen():
+            url = os.getenv('POSTGRES_DATABASE_URL').replace('postgresql+asyncpg://', 'postgresql://')
+            delay = 1
+
+            while True:
+                try:
+                    self._connection = await asyncpg.connect(url)
+                    await self._connection.add_listener(NOTE_FEED_CHANNEL, self._dispatch)
+                    delay = 1
+
+                    #anything published while we were disconnected is lost, so streams re-read from their watermark
+                    self._resync_all()
+
+                    while not self._connection.is_closed():
+                        await asyncio.sleep(5)
+
+                except asyncio.CancelledError:
+                    raise
+
+                except Exception as e:
+                    print(f"Note feed listener failed: {e}")
+
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+        self._task = asyncio.create_task(listen())
+
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self._connection is not None and not self._connection.is_closed():
+            await self._connection.close()
+
+
+note_feed = NoteFeed()
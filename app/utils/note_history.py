@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import zlib
+from difflib import SequenceMatcher
+from typing import Optional, Tuple
+from uuid import UUID
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.note_revision_models import NoteRevision
+
+
+def compress_snapshot(content: str) -> bytes:
+    return zlib.compress(content.encode(), 6)
+
+
+def decompress_snapshot(data: bytes) -> str:
+    return zlib.decompress(data).decode()
+
+
+def encode_delta(base: str, content: str) -> bytes:
+    """
+    Line-based delta from `base` to `content`: ["c", start, end] copies base lines,
+    ["i", text] inserts new text. Serialized as JSON and zlib-compressed.
+    """
+    base_lines = base.splitlines(keepends=True)
+    new_lines = content.splitlines(keepends=True)
+    ops = []
+
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, base_lines, new_lines, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(['c', i1, i2])
+        elif j2 > j1:
+            ops.append(['i', ''.join(new_lines[j1:j2])])
+
+    return zlib.compress(json.dumps(ops, separators=(',', ':')).encode(), 6)
+
+
+def apply_delta(base: str, data: bytes) -> str:
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+
+    for op in json.loads(zlib.decompress(data)):
+        if op[0] == 'c':
+            parts.extend(base_lines[op[1]:op[2]])
+        else:
+            parts.append(op[1])
+
+    return ''.join(parts)
+
+
+def encode_revision(snapshot: Optional[Tuple[int, bytes]], content: str, delta_max_bytes: int) -> dict:
+    """
+    Column values for a new revision: a delta against `snapshot` when there is one and both
+    sides are under `delta_max_bytes` (the line diff can go quadratic on big notes), otherwise
+    a fresh snapshot. CPU-bound; call it off the event loop.
+    """
+    if snapshot is not None and len(content) <= delta_max_bytes:
+        base_version, base_data = snapshot
+        base = decompress_snapshot(base_data)
+
+        if len(base) <= delta_max_bytes:
+            return {'is_snapshot': False, 'base_version': base_version, 'data': encode_delta(base, content)}
+
+    return {'is_snapshot': True, 'base_version': None, 'data': compress_snapshot(content)}
+
+
+class NoteHistory:
+    """
+    Stores every version of a note in note_revisions.
+
+    Every `snapshot_every` versions a full compressed snapshot is written; the versions in
+    between are stored as deltas against that snapshot (not against each other), so rebuilding
+    any version costs at most one snapshot plus one delta. Each new snapshot is also the point
+    where revisions older than `max_revisions` are pruned, keeping whole snapshot groups.
+    Notes larger than `delta_max_bytes` are always stored as snapshots, and all compression
+    and diffing runs in a worker thread so big notes don't stall the event loop.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv('NOTE_HISTORY_ENABLED', 'true').lower() == 'true'
+        self.snapshot_every = int(os.getenv('NOTE_HISTORY_SNAPSHOT_EVERY', 20))
+        self.max_revisions = int(os.getenv('NOTE_HISTORY_MAX_REVISIONS', 200))
+        self.delta_max_bytes = int(os.getenv('NOTE_HISTORY_DELTA_MAX_BYTES', 256 * 1024))
+
+
+    async def _latest_snapshot(self, db: AsyncSession, note_id: UUID) -> Optional[Tuple[int, bytes]]:
+        statement = (
+            select(NoteRevision.version, NoteRevision.data)
+            .where(NoteRevision.note_id == note_id, NoteRevision.is_snapshot == True)
+            .order_by(NoteRevision.version.desc())
+            .limit(1)
+        )
+        return (await db.execute(statement)).one_or_none()
+
+
+    async def record(self, db: AsyncSession, note_id: UUID, version: int, title: str, content: Optional[str]):
+        if not self.enabled:
+            return
+
+        content = content or ''
+        snapshot = None
+
+        #a note over the delta cap gets a snapshot anyway, so don't fetch the base
+        if version % self.snapshot_every != 1 and self.snapshot_every > 1 and len(content) <= self.delta_max_bytes:
+            snapshot = await self._latest_snapshot(db, note_id)
+
+        values = await asyncio.to_thread(encode_revision, snapshot, content, self.delta_max_bytes)
+
+        statement = insert(NoteRevision).values(
+            note_id=note_id,
+            version=version,
+            title=title,
+            content_length=len(content),
+            **values
+        ).on_conflict_do_nothing(index_elements=['note_id', 'version'])
+
+        await db.execute(statement)
+
+        if values['is_snapshot']:
+            await self.prune(db, note_id, version)
+
+
+    async def record_snapshots(self, db: AsyncSession, notes: list):
+        """First revision of freshly created notes, in one multi-row INSERT."""
+        if not self.enabled or not notes:
+            return
+
+        contents = [note.content or '' for note in notes]
+        compressed = await asyncio.to_thread(lambda: [compress_snapshot(content) for content in contents])
+
+        rows = [
+            {
+                'note_id': note.id,
+                'version': note.version,
+                'is_snapshot': True,
+                'base_version': None,
+                'title': note.title,
+                'data': data,
+                'content_length': len(content),
+            }
+            for note, content, data in zip(notes, contents, compressed)
+        ]
+
+        await db.execute(insert(NoteRevision).values(rows).on_conflict_do_nothing(index_elements=['note_id', 'version']))
+
+
+    async def prune(self, db: AsyncSession, note_id: UUID, latest_version: int):
+        oldest_wanted = latest_version - self.max_revisions
+
+        if oldest_wanted <= 1:
+            return
+
+        #keep from the snapshot that the oldest wanted revision depends on
+        keep_from = (await db.execute(
+            select(func.max(NoteRevision.version))
+            .where(NoteRevision.note_id == note_id, NoteRevision.is_snapshot == True, NoteRevision.version <= oldest_wanted)
+        )).scalar_one_or_none()
+
+        if keep_from is not None:
+            await db.execute(delete(NoteRevision).where(NoteRevision.note_id == note_id, NoteRevision.version < keep_from))
+
+
+    async def reconstruct(self, db: AsyncSession, note_id: UUID, version: int) -> Optional[Tuple[str, str]]:
+        """Returns (title, content) of the given version, or None if it isn't stored."""
+        revision = (await db.execute(
+            select(NoteRevision.is_snapshot, NoteRevision.base_version, NoteRevision.title, NoteRevision.data)
+            .where(NoteRevision.note_id == note_id, NoteRevision.version == version)
+        )).one_or_none()
+
+        if revision is None:
+            return None
+
+        if revision.is_snapshot:
+            return revision.title, decompress_snapshot(revision.data)
+
+        base_data = (await db.execute(
+            select(NoteRevision.data).where(NoteRevision.note_id == note_id, NoteRevision.version == revision.base_version)
+        )).scalar_one()
+
+        return revision.title, apply_delta(decompress_snapshot(base_data), revision.data)
+
+
+note_history = NoteHistory()
@@ -0,0 +1,31 @@
+from uuid import UUID
+from sqlalchemy import Date, cast, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.note_stats_models import NoteDailyStats
+
+
+def utc_day(column):
+    """The UTC calendar day of a timestamptz, the bucket note_daily_stats is keyed by."""
+    return cast(func.timezone('UTC', column), Date)
+
+
+async def record_activity(db: AsyncSession, user_id: UUID, created: int = 0, updated: int = 0, deleted: int = 0):
+    """Adds to today's rollup row for the user, inside the caller's transaction."""
+    statement = insert(NoteDailyStats).values(
+        user_id=user_id,
+        day=utc_day(func.now()),
+        created=created,
+        updated=updated,
+        deleted=deleted
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[NoteDailyStats.user_id, NoteDailyStats.day],
+        set_={
+            'created': NoteDailyStats.created + statement.excluded.created,
+            'updated': NoteDailyStats.updated + statement.excluded.updated,
+            'deleted': NoteDailyStats.deleted + statement.excluded.deleted,
+        }
+    )
+
+    await db.execute(statement)
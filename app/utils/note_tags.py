@@ -0,0 +1,47 @@
+from collections import Counter
+from typing import Iterable, List, Optional
+from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.note_tag_models import NoteTagCount
+
+
+MAX_TAGS = 20
+MAX_TAG_LENGTH = 50
+
+
+def normalize_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    """Lowercased, trimmed, de-duplicated and sorted, so equal tag sets compare (and cache) equal."""
+    if not tags:
+        return []
+
+    normalized = sorted({tag.strip().lower() for tag in tags if tag and tag.strip()})
+
+    if len(normalized) > MAX_TAGS:
+        raise ValueError(f"A note can have at most {MAX_TAGS} tags")
+
+    for tag in normalized:
+        if len(tag) > MAX_TAG_LENGTH:
+            raise ValueError(f"Tags can be at most {MAX_TAG_LENGTH} characters")
+
+    return normalized
+
+
+async def adjust_tag_counts(db: AsyncSession, user_id: UUID, added: Iterable[str] = (), removed: Iterable[str] = ()):
+    """Applies +1/-1 per tag to the user's facet counters in one upsert, inside the caller's transaction."""
+    deltas = Counter(added)
+    deltas.subtract(removed)
+
+    rows = [{'user_id': user_id, 'tag': tag, 'count': delta} for tag, delta in sorted(deltas.items()) if delta]
+
+    if not rows:
+        return
+
+    #sorted rows keep the lock order stable across concurrent writers
+    statement = insert(NoteTagCount).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[NoteTagCount.user_id, NoteTagCount.tag],
+        set_={'count': NoteTagCount.count + statement.excluded.count}
+    )
+
+    await db.execute(statement)
@@ -0,0 +1,96 @@
+import asyncio
+import os
+from typing import Awaitable, Dict, Optional
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+#statement_timeout per route in milliseconds; heavy reads get less so they can't hog a connection
+ROUTE_STATEMENT_TIMEOUTS: Dict[str, int] = {
+    'get_note_route': 1000,
+    'search_notes_route': 2000,
+    'list_notes_route': 3000,
+    'tag_facets_route': 3000,
+    'note_stats_route': 3000,
+}
+
+DEFAULT_STATEMENT_TIMEOUT = int(os.getenv('STATEMENT_TIMEOUT_MS', 5000))
+
+#e.g. STATEMENT_TIMEOUT_ROUTES="search_notes_route=1500,list_notes_route=2000"
+for entry in filter(None, os.getenv('STATEMENT_TIMEOUT_ROUTES', '').split(',')):
+    route, _, timeout = entry.partition('=')
+    ROUTE_STATEMENT_TIMEOUTS[route.strip()] = int(timeout)
+
+CANCEL_ON_DISCONNECT = os.getenv('CANCEL_ON_DISCONNECT', 'true').lower() == 'true'
+
+#query_canceled, raised both for statement_timeout and for an explicit cancel request
+QUERY_CANCELED = '57014'
+
+#nginx's status for a request the client abandoned; only ever seen in logs and metrics
+CLIENT_CLOSED_REQUEST = 499
+
+
+def statement_timeout_for(route: Optional[str]) -> int:
+    """Milliseconds, 0 meaning no limit."""
+    return ROUTE_STATEMENT_TIMEOUTS.get(route, DEFAULT_STATEMENT_TIMEOUT)
+
+
+def install_statement_timeout_hook():
+    #SET LOCAL lasts until the end of the transaction, so it's reissued whenever the session begins one
+    @event.listens_for(Session, 'after_begin')
+    def set_statement_timeout(session, transaction, connection):
+        timeout = session.info.get('statement_timeout')
+
+        if timeout:
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+
+def is_statement_timeout(error: BaseException) -> bool:
+    #controllers turn database errors into HTTPExceptions, so look down the chain for the original
+    while error is not None:
+        orig = getattr(error, 'orig', None)
+        code = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+
+        if code == QUERY_CANCELED:
+            return True
+
+        error = error.__cause__ or error.__context__
+
+    return False
+
+
+async def run_until_disconnect(request: Request, handler: Awaitable[Response]) -> Response:
+    """
+    Runs the route handler in its own task and cancels it if the client disconnects first.
+    Cancelling the task cancels any query asyncpg has in flight on the server too.
+    """
+    #read the body up front so the watcher below only ever receives the disconnect
+    await request.body()
+
+    task = asyncio.ensure_future(handler)
+    disconnected = False
+
+    async def watch():
+        nonlocal disconnected
+
+        while True:
+            message = await request.receive()
+
+            if message['type'] == 'http.disconnect':
+                disconnected = True
+                task.cancel()
+                return
+
+    watcher = asyncio.create_task(watch())
+
+    try:
+        return await task
+
+    except asyncio.CancelledError:
+        if disconnected:
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+        raise
+
+    finally:
+        watcher.cancel()
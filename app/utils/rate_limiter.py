@@ -4,6 +4,7 @@ from fastapi import Request
 from typing import Dict, List
 import asyncio
 import hashlib
+from utils.metrics import RATE_LIMIT_DECISIONS, RATE_LIMIT_KEYS, RATE_LIMIT_LOCK_WAIT
 
 
 class SimpleRateLimiter:
@@ -41,6 +42,8 @@ class SimpleRateLimiter:
             
             for key in keys_to_delete:
                 del self.requests[key]
+            
+            RATE_LIMIT_KEYS.set(len(self.requests))
                 
     
     def _get_user_key(self, request: Request) -> str:
@@ -64,8 +67,11 @@ class SimpleRateLimiter:
     async def is_allowed(self, request: Request) -> tuple:
         user_key = self._get_user_key(request)
         current_time = time.time()
+        lock_started = time.perf_counter()
         
         async with self.lock:
+            RATE_LIMIT_LOCK_WAIT.observe(time.perf_counter() - lock_started)
+            
             timestamps = self.requests[user_key]
             
             cutoff = current_time - self.window_seconds
@@ -76,11 +82,14 @@ class SimpleRateLimiter:
                 reset_time = int(oldest_timestamp + self.window_seconds)
                 remaining = 0
                 
+                RATE_LIMIT_DECISIONS.labels('deny').inc()
                 return False, remaining, reset_time
             
             valid_timestamps.append(current_time)
             self.requests[user_key] = valid_timestamps
             
+            RATE_LIMIT_DECISIONS.labels('allow').inc()
+            RATE_LIMIT_KEYS.set(len(self.requests))
 
             remaining = self.max_requests - len(valid_timestamps)
             reset_time = int(current_time + self.window_seconds)
@@ -0,0 +1,182 @@
+import time
+import os
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional, Callable
+from fastapi import Request, HTTPException
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.query_budget import CANCEL_ON_DISCONNECT, is_statement_timeout, run_until_disconnect
+from utils.metrics import DB_POOL_WAIT
+from utils.concurrency_limiter import current_slot
+
+
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'false').lower() == 'true'
+REQUEST_TIMING_LOG = os.getenv('REQUEST_TIMING_LOG', 'false').lower() == 'true'
+REQUEST_TIMING_ENABLED = SERVER_TIMING_HEADER or REQUEST_TIMING_LOG
+
+
+class RequestTiming:
+    """
+    Per-request breakdown of where the time went. Phases are in milliseconds and
+    whatever is not attributed to a phase is reported as `app` (handler Python code).
+    """
+
+    __slots__ = ('started', 'phases', 'statements', 'route', 'endpoint_finished')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.statements = 0
+        self.route: Optional[str] = None
+        self.endpoint_finished: Optional[float] = None
+
+
+    def add(self, phase: str, started: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + (time.perf_counter() - started) * 1000
+
+
+    def total(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+    def breakdown(self) -> Dict[str, float]:
+        total = self.total()
+        phases = dict(self.phases)
+        phases['app'] = max(0.0, total - sum(phases.values()))
+        phases['total'] = total
+        return phases
+
+
+    def header_value(self) -> str:
+        parts = []
+
+        for phase, duration in self.breakdown().items():
+            if phase == 'sql':
+                parts.append(f'sql;dur={duration:.2f};desc="{self.statements} statements"')
+            else:
+                parts.append(f'{phase};dur={duration:.2f}')
+
+        return ', '.join(parts)
+
+
+#None unless the timing middleware is active for this request, so every hook is a single lookup when disabled
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar('current_timing', default=None)
+
+#name of the route handling the current request, for tagging SQL and diagnostics
+current_route: ContextVar[Optional[str]] = ContextVar('current_route', default=None)
+
+
+def install_sql_hooks(engine):
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_timing.get() is not None:
+            context._timing_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        timing = current_timing.get()
+
+        if timing is not None:
+            timing.add('sql', context._timing_started)
+            timing.statements += 1
+
+
+def install_checkout_hooks():
+    """
+    One pair of Session hooks timing the wait for a pool connection, shared by the pool wait
+    histogram, the request's `checkout` phase and the concurrency limiter's slot.
+    """
+    #pool checkout happens when the session begins its first transaction, not when connect_db yields it
+    @event.listens_for(Session, 'do_orm_execute')
+    def before_first_statement(orm_execute_state):
+        session = orm_execute_state.session
+
+        if not session.in_transaction():
+            session.info['checkout_started'] = time.perf_counter()
+
+    @event.listens_for(Session, 'after_begin')
+    def after_begin(session, transaction, connection):
+        started = session.info.pop('checkout_started', None)
+
+        if started is None:
+            return
+
+        DB_POOL_WAIT.observe(time.perf_counter() - started)
+        timing = current_timing.get()
+        slot = current_slot.get()
+
+        if timing is not None:
+            timing.add('checkout', started)
+
+        if slot is not None:
+            slot.pool_wait += time.perf_counter() - started
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    @wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+
+        except Exception as e:
+            #raised here rather than in the handler so dependencies (the concurrency limiter) see the 504
+            if is_statement_timeout(e):
+                raise HTTPException(status_code=504, detail="The query took too long, try narrowing the request") from e
+            raise
+
+        finally:
+            timing = current_timing.get()
+
+            if timing is not None:
+                timing.endpoint_finished = time.perf_counter()
+
+            #controllers return schemas, not ORM objects, so the pooled connection can go back
+            #before the response is validated and serialized rather than when connect_db exits
+            for value in kwargs.values():
+                if isinstance(value, AsyncSession):
+                    await value.close()
+
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Route class that attributes response validation and serialization time to `serialize`,
+    closes the endpoint's database session as soon as the endpoint returns, turns statement
+    timeouts into 504s and cancels read requests when the client disconnects.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route_name = self.name
+        #only reads are abandoned with their client; a write cancelled after its COMMIT reached the
+        #server would persist without its cache invalidation and other post-commit bookkeeping
+        cancel_on_disconnect = CANCEL_ON_DISCONNECT and self.methods <= {'GET', 'HEAD'}
+
+        async def timed_handler(request: Request):
+            current_route.set(route_name)
+            timing = current_timing.get()
+
+            if timing is not None:
+                timing.route = route_name
+
+            if cancel_on_disconnect:
+                response = await run_until_disconnect(request, handler(request))
+            else:
+                response = await handler(request)
+
+            if timing is not None and timing.endpoint_finished is not None:
+                timing.add('serialize', timing.endpoint_finished)
+
+            return response
+
+        return timed_handler
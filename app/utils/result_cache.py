@@ -0,0 +1,133 @@
+import time
+import os
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from utils.metrics import RESULT_CACHE_REQUESTS, RESULT_CACHE_BYTES, RESULT_CACHE_EVICTIONS
+
+
+class CacheBackend:
+    """Storage interface for ResultCache. Keys are never reused after a write, so there is no delete."""
+
+    async def get(self, key: Hashable) -> Optional[str]:
+        raise NotImplementedError
+
+
+    async def set(self, key: Hashable, value: str, ttl: float):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU bounded by the total size of the cached bodies, with a per-entry TTL."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: "OrderedDict[Hashable, Tuple[str, float]]" = OrderedDict()
+
+
+    async def get(self, key: Hashable) -> Optional[str]:
+        entry = self.entries.get(key)
+
+        if entry is None:
+            return None
+
+        value, expires_at = entry
+
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+
+    async def set(self, key: Hashable, value: str, ttl: float):
+        if len(value) > self.max_bytes:
+            return
+
+        if key in self.entries:
+            self._remove(key)
+
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.size += len(value)
+
+        while self.size > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            RESULT_CACHE_EVICTIONS.inc()
+
+        RESULT_CACHE_BYTES.set(self.size)
+
+
+    def _remove(self, key: Hashable):
+        value, _ = self.entries.pop(key)
+        self.size -= len(value)
+
+
+class ResultCache:
+    """
+    Caches serialized list/search responses under (epoch, user_id, generation, route, params).
+
+    A note write only bumps the user's generation, which is O(1): older entries can no longer
+    be addressed and age out of the LRU, so invalidation never scans keys. Other workers bump
+    their generation when the write's NOTIFY arrives on the note feed; the TTL bounds how
+    stale a worker can be if that notification is missed.
+
+    Off by default: until the NOTIFY arrives, another worker can serve a user a page that
+    predates their own write. Without the note feed nothing invalidates other workers at
+    all, so the cache stays off then even if RESULT_CACHE_ENABLED is set.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.enabled = (
+            os.getenv('RESULT_CACHE_ENABLED', 'false').lower() == 'true'
+            and os.getenv('NOTE_FEED_ENABLED', 'true').lower() == 'true'
+        )
+        self.ttl = float(os.getenv('RESULT_CACHE_TTL', 60))
+        self.max_users = int(os.getenv('RESULT_CACHE_MAX_USERS', 100000))
+        self.generations: Dict[str, int] = {}
+        self.epoch = 0
+
+
+    def bump(self, user_id) -> Tuple[int, int]:
+        """Starts a new generation for the user and returns the one it replaces."""
+        user_id = str(user_id)
+        previous = self.generation(user_id)
+
+        if user_id not in self.generations and len(self.generations) >= self.max_users:
+            #forgetting a user's generation could resurrect its old entries, so start a new epoch instead
+            self.generations.clear()
+            self.epoch += 1
+
+        self.generations[user_id] = self.generations.get(user_id, 0) + 1
+        return previous
+
+
+    def generation(self, user_id) -> Tuple[int, int]:
+        return self.epoch, self.generations.get(str(user_id), 0)
+
+
+    async def get_or_load(self, user_id, route: str, params: tuple, load: Callable[[], Awaitable[str]]) -> str:
+        if not self.enabled:
+            return await load()
+
+        user_id = str(user_id)
+
+        #the key is fixed before loading, so a write that lands mid-load just orphans this entry
+        key = (*self.generation(user_id), user_id, route, params)
+
+        cached = await self.backend.get(key)
+
+        if cached is not None:
+            RESULT_CACHE_REQUESTS.labels(route, 'hit').inc()
+            return cached
+
+        RESULT_CACHE_REQUESTS.labels(route, 'miss').inc()
+
+        body = await load()
+        await self.backend.set(key, body, self.ttl)
+        return body
+
+
+result_cache = ResultCache(MemoryCacheBackend(int(os.getenv('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))))
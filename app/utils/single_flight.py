@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from database.db import SessionLocal
+from utils.metrics import SINGLE_FLIGHT_REQUESTS
+from utils.request_timing import current_route
+from utils.query_budget import statement_timeout_for
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent reads: the first caller for a key starts the work in its
+    own task and session, later callers for the same key await that task instead of
+    querying again. Exceptions reach every waiter.
+
+    The work runs detached from any one request, so a caller that disconnects does not
+    cancel it for the others; it is only cancelled once every waiter has gone away.
+    """
+
+    def __init__(self):
+        self.in_flight: Dict[Hashable, list] = {}
+
+
+    async def run(self, key: Hashable, work: Callable[[Any], Awaitable[Any]]) -> Any:
+        entry = self.in_flight.get(key)
+
+        if entry is None:
+            SINGLE_FLIGHT_REQUESTS.labels('leader').inc()
+
+            async def execute():
+                try:
+                    async with SessionLocal() as db:
+                        #the task inherits the leader's context, so this is the leader's route budget
+                        db.info['statement_timeout'] = statement_timeout_for(current_route.get())
+                        return await work(db)
+                finally:
+                    #a cancelled entry may already have been replaced by a fresh one for the same key
+                    if self.in_flight.get(key) is entry:
+                        del self.in_flight[key]
+
+            # [task, waiter count]
+            entry = [None, 0]
+            entry[0] = asyncio.create_task(execute())
+            self.in_flight[key] = entry
+        else:
+            SINGLE_FLIGHT_REQUESTS.labels('follower').inc()
+
+        task = entry[0]
+        entry[1] += 1
+
+        try:
+            return await asyncio.shield(task)
+
+        except asyncio.CancelledError:
+            if entry[1] == 1 and not task.done():
+                task.cancel()
+
+                #callers arriving from now on start a new query instead of joining the cancelled one
+                if self.in_flight.get(key) is entry:
+                    del self.in_flight[key]
+            raise
+
+        finally:
+            entry[1] -= 1
+
+
+read_coalescer = SingleFlight()
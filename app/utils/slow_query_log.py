@@ -0,0 +1,159 @@
+import time
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+from collections import deque
+from typing import Dict, Optional
+from sqlalchemy import event
+from utils.request_timing import current_route
+
+
+logger = logging.getLogger('slow_query')
+
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+
+_literal_pattern = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_placeholder_pattern = re.compile(r'\$\d+|%\(\w+\)s|:\w+')
+_in_list_pattern = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    normalized = _literal_pattern.sub('?', statement)
+    normalized = _placeholder_pattern.sub('?', normalized)
+    normalized = _in_list_pattern.sub('IN (...)', normalized)
+    return ' '.join(normalized.split())
+
+
+def parameter_shapes(parameters) -> list:
+    """Type and size of each bound parameter, never the value itself."""
+    values = parameters.values() if isinstance(parameters, dict) else (parameters or ())
+    shapes = []
+
+    for value in values:
+        if isinstance(value, (str, bytes, list, tuple)):
+            shapes.append(f'{type(value).__name__}[{len(value)}]')
+        else:
+            shapes.append(type(value).__name__)
+
+    return shapes
+
+
+class SlowQueryLog:
+    """
+    Records statements slower than `threshold_ms`, grouped by normalized SQL fingerprint.
+
+    Only the `top_n` slowest fingerprints are kept, plus a ring buffer of the most recent
+    slow events. A sampled fraction of slow statements is re-planned with EXPLAIN (FORMAT JSON)
+    on a separate connection, in the background, so the request that hit it isn't delayed.
+    """
+
+    def __init__(self, threshold_ms: float, explain_sample_rate: float = 0.1, top_n: int = 50, recent: int = 200):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.top_n = top_n
+        self.fingerprints: Dict[str, dict] = {}
+        self.recent = deque(maxlen=recent)
+        self.engine = None
+
+
+    def install(self, engine):
+        self.engine = engine
+        sync_engine = engine.sync_engine
+
+        @event.listens_for(sync_engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context._slow_query_started = time.perf_counter()
+
+        @event.listens_for(sync_engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            duration_ms = (time.perf_counter() - context._slow_query_started) * 1000
+
+            if duration_ms >= self.threshold_ms and not context.execution_options.get('slow_query_explain'):
+                self.record(statement, parameters, duration_ms)
+
+
+    def record(self, statement: str, parameters, duration_ms: float):
+        fingerprint = normalize_sql(statement)
+        route = current_route.get()
+
+        sample = {
+            'fingerprint': fingerprint,
+            'duration_ms': round(duration_ms, 3),
+            'route': route,
+            'parameter_shapes': parameter_shapes(parameters),
+            'at': time.time(),
+        }
+
+        self.recent.append(sample)
+        logger.info(json.dumps(sample))
+
+        entry = self.fingerprints.get(fingerprint)
+
+        if entry is None:
+            entry = {'fingerprint': fingerprint, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'routes': {}, 'slowest': None, 'explain': None}
+            self.fingerprints[fingerprint] = entry
+
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['routes'][route] = entry['routes'].get(route, 0) + 1
+
+        if duration_ms > entry['max_ms']:
+            entry['max_ms'] = duration_ms
+            entry['slowest'] = sample
+
+        if len(self.fingerprints) > self.top_n * 2:
+            self._trim()
+
+        if self.engine is not None and random.random() < self.explain_sample_rate:
+            try:
+                asyncio.get_running_loop().create_task(self._explain(entry, statement, parameters))
+
+            except RuntimeError:
+                pass
+
+
+    def _trim(self):
+        keep = sorted(self.fingerprints.values(), key=lambda entry: entry['max_ms'], reverse=True)[:self.top_n]
+        self.fingerprints = {entry['fingerprint']: entry for entry in keep}
+
+
+    async def _explain(self, entry: dict, statement: str, parameters):
+        try:
+            async with self.engine.connect() as conn:
+                #flagged so the EXPLAIN itself isn't recorded as a slow query
+                result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters, execution_options={'slow_query_explain': True})
+                raw = result.scalar_one()
+
+                entry['explain'] = json.loads(raw) if isinstance(raw, str) else raw
+                await conn.rollback()
+
+        except Exception as e:
+            entry['explain'] = {'error': str(e)}
+
+
+    def top(self, limit: Optional[int] = None) -> list:
+        entries = sorted(self.fingerprints.values(), key=lambda entry: entry['max_ms'], reverse=True)[:limit or self.top_n]
+
+        return [
+            {**entry, 'mean_ms': round(entry['total_ms'] / entry['count'], 3), 'total_ms': round(entry['total_ms'], 3), 'max_ms': round(entry['max_ms'], 3)}
+            for entry in entries
+        ]
+
+
+def slow_query_log_from_env() -> Optional[SlowQueryLog]:
+    threshold = os.getenv('SLOW_QUERY_MS')
+
+    if not threshold:
+        return None
+
+    return SlowQueryLog(
+        threshold_ms=float(threshold),
+        explain_sample_rate=float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', 0.1)),
+        top_n=int(os.getenv('SLOW_QUERY_TOP_N', 50))
+    )
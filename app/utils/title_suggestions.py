@@ -0,0 +1,202 @@
+import asyncio
+import os
+import re
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import select
+from models.notes_models import Note
+from utils.result_cache import result_cache
+from utils.single_flight import read_coalescer
+
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_title(text: str) -> str:
+    return _whitespace.sub(' ', text.replace('\x00', '')).strip().lower()
+
+
+def title_keys(note_id: str, title: str) -> List[str]:
+    """One key per word start, so "weekly team sync" completes from "team" and "sync" too."""
+    words = normalize_title(title).split(' ')
+    return [f"{' '.join(words[i:])}\x00{note_id}" for i in range(len(words)) if words[i]]
+
+
+class UserTitleIndex:
+    """Sorted array of title keys for one user; a prefix lookup is a bisect plus a short forward scan."""
+
+    __slots__ = ('keys', 'titles', 'generation', 'built_at')
+
+    def __init__(self, rows, generation: Tuple[int, int]):
+        self.titles: Dict[str, str] = {str(note_id): title for note_id, title in rows}
+        self.keys = sorted(key for note_id, title in self.titles.items() for key in title_keys(note_id, title))
+        self.generation = generation
+        self.built_at = time.monotonic()
+
+
+    def remove(self, note_id: str):
+        title = self.titles.pop(note_id, None)
+
+        if title is None:
+            return
+
+        for key in title_keys(note_id, title):
+            position = bisect_left(self.keys, key)
+
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+
+    def put(self, note_id: str, title: str):
+        self.remove(note_id)
+        self.titles[note_id] = title
+
+        for key in title_keys(note_id, title):
+            insort(self.keys, key)
+
+
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        results = []
+        seen = set()
+
+        for position in range(bisect_left(self.keys, prefix), len(self.keys)):
+            key = self.keys[position]
+
+            if not key.startswith(prefix):
+                break
+
+            note_id = key.rsplit('\x00', 1)[1]
+
+            if note_id in seen:
+                continue
+
+            seen.add(note_id)
+            results.append({'note_id': note_id, 'title': self.titles[note_id]})
+
+            if len(results) == limit:
+                break
+
+        return results
+
+
+class TitleSuggestions:
+    """
+    Per-user title prefix indexes for autocomplete, built lazily from the database on a user's
+    first lookup and kept in an LRU bounded by the total number of keys.
+
+    Each index is tagged with the user's result-cache generation. Local writes update the index
+    in place and move it to the new generation; a write seen only through another worker's
+    notification leaves the tags mismatched, and the index is rebuilt on the next lookup.
+
+    Those notifications are the only way other workers' writes reach an index, so it is off
+    without the note feed, every index is dropped when the feed reconnects (anything sent
+    while it was down is lost), and an index older than max_age is rebuilt regardless.
+    """
+
+    def __init__(self):
+        self.enabled = (
+            os.getenv('TITLE_SUGGEST_ENABLED', 'true').lower() == 'true'
+            and os.getenv('NOTE_FEED_ENABLED', 'true').lower() == 'true'
+        )
+        self.max_keys = int(os.getenv('TITLE_SUGGEST_MAX_KEYS', 2000000))
+        self.max_age = float(os.getenv('TITLE_SUGGEST_MAX_AGE', 300))
+        self.indexes: "OrderedDict[str, UserTitleIndex]" = OrderedDict()
+        self.size = 0
+
+
+    def _drop(self, user_id: str):
+        index = self.indexes.pop(user_id, None)
+
+        if index is not None:
+            self.size -= len(index.keys)
+
+
+    def clear(self):
+        self.indexes.clear()
+        self.size = 0
+
+
+    def _install(self, user_id: str, index: UserTitleIndex):
+        self._drop(user_id)
+
+        if len(index.keys) > self.max_keys:
+            return
+
+        self.indexes[user_id] = index
+        self.size += len(index.keys)
+
+        while self.size > self.max_keys:
+            self._drop(next(iter(self.indexes)))
+
+
+    async def _load(self, user_id: str) -> UserTitleIndex:
+        generation = result_cache.generation(user_id)
+
+        async def build(db):
+            statement = select(Note.id, Note.title).where(Note.user_id == UUID(user_id), Note.is_deleted == False)
+            rows = (await db.execute(statement)).all()
+
+            #sorting a heavy user's keys takes long enough to stall other requests if done on the loop
+            return await asyncio.to_thread(UserTitleIndex, rows, generation)
+
+        index = await read_coalescer.run(('titles', user_id, generation), build)
+
+        #a write during the build may be missing from it, so only a still-current index is kept
+        if result_cache.generation(user_id) == generation:
+            self._install(user_id, index)
+
+        return index
+
+
+    async def suggest(self, user_id, prefix: str, limit: int) -> List[dict]:
+        user_id = str(user_id)
+        prefix = normalize_title(prefix)
+
+        if not prefix:
+            return []
+
+        index = self.indexes.get(user_id)
+
+        stale = index is not None and time.monotonic() - index.built_at > self.max_age
+
+        if index is None or stale or index.generation != result_cache.generation(user_id):
+            index = await self._load(user_id)
+        else:
+            self.indexes.move_to_end(user_id)
+
+        return index.suggest(prefix, limit)
+
+
+    def note_written(self, user_id, previous_generation: Tuple[int, int], note_id, title: Optional[str]):
+        """
+        Applies a local write to a loaded index. `previous_generation` is what result_cache.bump
+        returned; `title` is None when the note was deleted.
+        """
+        user_id = str(user_id)
+        index = self.indexes.get(user_id)
+
+        if index is None:
+            return
+
+        if index.generation != previous_generation:
+            self._drop(user_id)
+            return
+
+        size = len(index.keys)
+
+        if title is None:
+            index.remove(str(note_id))
+        else:
+            index.put(str(note_id), title)
+
+        index.generation = result_cache.generation(user_id)
+        self.size += len(index.keys) - size
+
+        while self.size > self.max_keys:
+            self._drop(next(iter(self.indexes)))
+
+
+title_suggestions = TitleSuggestions()
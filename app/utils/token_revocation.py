@@ -0,0 +1,161 @@
+import time
+import asyncio
+import math
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.db import SessionLocal
+from models.revoked_token_models import RevokedToken
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over a bytearray. Lookups use the str's cached hash() with
+    double hashing, so checking a jti does not allocate. hash() is randomized per process,
+    which is fine since every worker builds its own filter.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+
+    def add(self, key: str):
+        h1 = hash(key)
+        h2 = (h1 >> 32) | 1
+
+        for i in range(self.hash_count):
+            index = (h1 + i * h2) % self.size
+            self.bits[index >> 3] |= 1 << (index & 7)
+
+
+    def __contains__(self, key: str) -> bool:
+        h1 = hash(key)
+        h2 = (h1 >> 32) | 1
+
+        for i in range(self.hash_count):
+            index = (h1 + i * h2) % self.size
+
+            if not self.bits[index >> 3] & (1 << (index & 7)):
+                return False
+
+        return True
+
+
+class TokenRevocationStore:
+    """
+    Per-process deny list of revoked token ids (jti).
+
+    The source of truth is the revoked_tokens table. Each worker keeps a bloom filter in
+    front of a jti -> expiry dict, so the common case (token not revoked) is answered from
+    memory without a DB round trip. A background task pulls revocations made by other
+    workers every `sync_interval` seconds, which bounds the propagation delay.
+    """
+
+    def __init__(self):
+        self.capacity = int(os.getenv('REVOCATION_BLOOM_CAPACITY', 100000))
+        self.sync_interval = float(os.getenv('REVOCATION_SYNC_SECONDS', 5))
+        self.revoked: Dict[str, float] = {}
+        self.bloom = BloomFilter(self.capacity)
+        self.last_synced: Optional[datetime] = None
+        self._sync_task = None
+
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti or jti not in self.bloom:
+            return False
+
+        expires_at = self.revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+
+    def _remember(self, jti: str, expires_at: float):
+        if jti not in self.revoked:
+            self.bloom.add(jti)
+
+        self.revoked[jti] = expires_at
+
+
+    def _prune(self):
+        now = time.time()
+        self.revoked = {jti: exp for jti, exp in self.revoked.items() if exp > now}
+
+        #bloom filters can't delete, so rebuild once expired entries are dropped
+        self.bloom = BloomFilter(max(self.capacity, len(self.revoked) * 2))
+
+        for jti in self.revoked:
+            self.bloom.add(jti)
+
+
+    async def revoke(self, jti: Optional[str], exp: Optional[int], db: AsyncSession):
+        if not jti or not exp:
+            return
+
+        expires_at = datetime.fromtimestamp(exp, tz=timezone.utc)
+
+        statement = insert(RevokedToken).values(jti=jti, expires_at=expires_at).on_conflict_do_nothing(index_elements=['jti'])
+
+        await db.execute(statement)
+        await db.commit()
+
+        self._remember(jti, float(exp))
+
+
+    async def sync(self):
+        async with SessionLocal() as session:
+            statement = select(RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at)
+
+            if self.last_synced is not None:
+                #overlap the window so rows committed late by slow transactions are not missed
+                statement = statement.where(RevokedToken.revoked_at > self.last_synced - timedelta(seconds=self.sync_interval * 2))
+            else:
+                statement = statement.where(RevokedToken.expires_at > datetime.now(timezone.utc))
+
+            result = await session.execute(statement)
+
+            for jti, expires_at, revoked_at in result.all():
+                self._remember(jti, expires_at.timestamp())
+
+                if self.last_synced is None or revoked_at > self.last_synced:
+                    self.last_synced = revoked_at
+
+            if self.last_synced is None:
+                self.last_synced = datetime.now(timezone.utc)
+
+
+    async def purge_expired(self):
+        async with SessionLocal() as session:
+            await session.execute(delete(RevokedToken).where(RevokedToken.expires_at < datetime.now(timezone.utc)))
+            await session.commit()
+
+        self._prune()
+
+
+    def start_sync(self):
+        if self._sync_task is not None:
+            return
+
+        async def sync_loop():
+            rounds = 0
+
+            while True:
+                try:
+                    await self.sync()
+
+                    rounds += 1
+                    if rounds % 720 == 0:
+                        await self.purge_expired()
+
+                except Exception as e:
+                    print(f"Token revocation sync failed: {e}")
+
+                await asyncio.sleep(self.sync_interval)
+
+        self._sync_task = asyncio.create_task(sync_loop())
+
+
+revocation_store = TokenRevocationStore()
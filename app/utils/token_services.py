@@ -3,6 +3,7 @@ import os
 from schemas.auth_schemas import TokenPayload
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
+from uuid import uuid4
 from fastapi import HTTPException, status
 
 
@@ -28,7 +29,8 @@ def generate_access_token(payload: TokenPayload):
         
         to_encode.update({
             "exp": expire_time,
-            "type": "access"
+            "type": "access",
+            "jti": uuid4().hex
         })
 
         token = jwt.encode(to_encode, ACCESS_SECRET, algorithm=ALGORITHM)
@@ -48,7 +50,7 @@ def generate_refresh_token(payload: TokenPayload | dict):
     if "id" in to_encode and isinstance(to_encode["id"], (bytes, bytearray)) is False:
             to_encode["id"] = str(to_encode["id"])
     
-    to_encode.update({"exp": expire_time, "type": "refresh"})
+    to_encode.update({"exp": expire_time, "type": "refresh", "jti": uuid4().hex})
     
     return jwt.encode(to_encode, REFRESH_SECRET, algorithm=ALGORITHM)
 
@@ -1,3 +1,5 @@
+import os
+import sys
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
@@ -7,9 +9,18 @@ from alembic import context
 
 from models.auth_models import User
 from models.notes_models import Note
+from models.revoked_token_models import RevokedToken
+from models.note_revision_models import NoteRevision
+from models.note_tag_models import NoteTagCount
+from models.note_stats_models import NoteDailyStats
+from models.note_archive_models import ArchivedNote, ArchivedNoteRevision
 
 from database.db import Base
 
+# version scripts import their helpers from online_migrations.py next to this file
+sys.path.insert(0, os.path.dirname(__file__))
+from online_migrations import LOCK_TIMEOUT
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -69,8 +80,14 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        # fail fast rather than queue every write to a table behind a migration waiting for its lock
+        connection.exec_driver_sql(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+        connection.commit()
+
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata,
+            # a failed step rolls back only its own migration, so reruns resume from there
+            transaction_per_migration=True
         )
 
         with context.begin_transaction():
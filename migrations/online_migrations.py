@@ -0,0 +1,183 @@
+"""
+Helpers for schema changes that must not block writes on large, busy tables.
+
+Conventions for migrations that touch existing tables:
+
+- Indexes are built with `create_index_concurrently` / dropped with `drop_index_concurrently`.
+  CONCURRENTLY can't run inside a transaction, so these step out of the migration's
+  transaction (alembic's autocommit_block); keep them as the last statements of a migration.
+- Every statement runs under `lock_timeout` (MIGRATION_LOCK_TIMEOUT, set in env.py). A DDL
+  statement that can't get its lock quickly fails instead of queueing behind a long
+  transaction while every write to the table queues behind it. Concurrent index builds and
+  drops are the exception: their lock doesn't block writes, so they wait as long as needed.
+- Anything a migration does before stepping out of its transaction is committed even if a
+  later step fails, and the revision isn't stamped, so those statements must be rerunnable.
+- New columns are added nullable (or with a constant default, which doesn't rewrite the table),
+  filled with `batched_backfill`, and only then made NOT NULL with `set_not_null` (which also
+  commits step by step, so it goes last as well).
+
+Indexes on tables created in the same migration don't need any of this: nobody is writing to
+them yet.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional, Sequence
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.exc import DBAPIError
+
+
+LOCK_TIMEOUT = os.getenv('MIGRATION_LOCK_TIMEOUT', '5s')
+LOCK_RETRIES = int(os.getenv('MIGRATION_LOCK_RETRIES', 5))
+
+#lock_not_available, raised when lock_timeout expires
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+def _is_lock_timeout(error: DBAPIError) -> bool:
+    orig = error.orig
+    code = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+    return code == LOCK_NOT_AVAILABLE
+
+
+def _with_lock_retries(statement, retries: int):
+    """Runs statement() outside a transaction, backing off and retrying when the lock isn't granted in time."""
+    for attempt in range(retries):
+        try:
+            return statement()
+
+        except DBAPIError as e:
+            if not _is_lock_timeout(e) or attempt == retries - 1:
+                raise
+
+            time.sleep(min(2 ** attempt, 30))
+
+
+def _invalid_index_exists(name: str) -> bool:
+    row = op.get_bind().execute(sa.text(
+        "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND c.relkind = 'i'"
+    ), {'name': name}).first()
+    return bool(row and row[0])
+
+
+@contextmanager
+def _without_lock_timeout():
+    """
+    CONCURRENTLY waits for every older transaction to finish, and those waits count against
+    lock_timeout; one long transaction would throw away a build that may have run for minutes.
+    The lock it takes (SHARE UPDATE EXCLUSIVE) doesn't block reads or writes, so waiting is fine.
+    """
+    op.execute('SET lock_timeout = 0')
+
+    try:
+        yield
+    finally:
+        op.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+
+
+def create_index_concurrently(name: str, table: str, columns: Sequence, **kw):
+    """
+    CREATE INDEX CONCURRENTLY, idempotent and safe to rerun: an INVALID index left behind by
+    an interrupted build is dropped and rebuilt; a valid one is kept.
+
+    Statements before it in the same migration are committed first, so they must be safe to
+    rerun too (IF NOT EXISTS) or live in an earlier revision.
+    """
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+            return
+
+        with _without_lock_timeout():
+            if _invalid_index_exists(name):
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(name: str, table: str):
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            return
+
+        with _without_lock_timeout():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def batched_backfill(table: str, set_clause: str, pending: str, batch_size: int = 5000, pause: float = 0.1, key: str = 'id', params: Optional[dict] = None):
+    """
+    UPDATE table SET <set_clause> in key order, batch_size rows per transaction, sleeping
+    `pause` seconds between batches so replication and autovacuum keep up.
+
+    `pending` is a condition that is true only for rows not yet backfilled (e.g. "tags IS NULL"),
+    so an interrupted backfill resumes where it stopped when the migration is rerun.
+    """
+    statement = sa.text(
+        f"UPDATE {table} SET {set_clause} "
+        f"WHERE {key} IN (SELECT {key} FROM {table} WHERE ({pending}) AND (CAST(:after AS text) IS NULL OR {key} > :after) "
+        f"ORDER BY {key} LIMIT :batch_size FOR UPDATE SKIP LOCKED) "
+        f"RETURNING {key}"
+    )
+
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            op.execute(f"UPDATE {table} SET {set_clause} WHERE {pending}")
+            return
+
+        bind = op.get_bind()
+        after = None
+        total = 0
+
+        while True:
+            #autocommit: every batch commits on its own and holds its row locks only briefly
+            keys = bind.execute(statement, {**(params or {}), 'after': after, 'batch_size': batch_size}).scalars().all()
+
+            if not keys:
+                break
+
+            #keyset on the key keeps each batch an index range scan as the table fills in
+            after = max(keys)
+            total += len(keys)
+            print(f"backfill {table}: {total} rows", flush=True)
+            time.sleep(pause)
+
+
+def _constraint_exists(table: str, name: str) -> bool:
+    row = op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_constraint WHERE conname = :name AND conrelid = CAST(:table AS regclass)"
+    ), {'name': name, 'table': table}).first()
+    return row is not None
+
+
+def set_not_null(table: str, column: str, retries: int = LOCK_RETRIES):
+    """
+    SET NOT NULL without holding ACCESS EXCLUSIVE for a full-table scan: a NOT VALID check is
+    added and committed, validated in a transaction of its own under SHARE UPDATE EXCLUSIVE
+    (writes keep going), and PostgreSQL 12+ then skips the scan for SET NOT NULL.
+
+    Each step commits on its own, so this steps out of the migration's transaction like the
+    concurrent index helpers; keep it last. Rerunning after an interruption is safe.
+    """
+    constraint = f'{table}_{column}_not_null'
+    add_constraint = f'ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID'
+    validate = f'ALTER TABLE {table} VALIDATE CONSTRAINT {constraint}'
+    alter_column = f'ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL'
+    drop_constraint = f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}'
+
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            for statement in (add_constraint, validate, alter_column, drop_constraint):
+                op.execute(statement)
+            return
+
+        #ADD CONSTRAINT and SET NOT NULL take ACCESS EXCLUSIVE, but only for a catalog update each
+        if not _constraint_exists(table, constraint):
+            _with_lock_retries(lambda: op.execute(add_constraint), retries)
+
+        _with_lock_retries(lambda: op.execute(validate), retries)
+        _with_lock_retries(lambda: op.execute(alter_column), retries)
+        _with_lock_retries(lambda: op.execute(drop_constraint), retries)
@@ -10,6 +10,8 @@ from typing import Sequence, Union
 from alembic import op
 import sqlalchemy as sa
 
+from online_migrations import create_index_concurrently, drop_index_concurrently
+
 
 # revision identifiers, used by Alembic.
 revision: str = '35b4482bfd7b'
@@ -20,17 +22,14 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.create_index('idx_notes_user_active', 'notes', ['user_id', 'is_deleted', 'updated_at'], unique=False)
-    op.create_index('idx_notes_user_created', 'notes', ['user_id', 'created_at'], unique=False)
-    op.create_index('idx_notes_user_title', 'notes', ['user_id', 'title'], unique=False)
-    # ### end Alembic commands ###
+    # built CONCURRENTLY so writes to notes continue during the build
+    create_index_concurrently('idx_notes_user_active', 'notes', ['user_id', 'is_deleted', 'updated_at'], unique=False)
+    create_index_concurrently('idx_notes_user_created', 'notes', ['user_id', 'created_at'], unique=False)
+    create_index_concurrently('idx_notes_user_title', 'notes', ['user_id', 'title'], unique=False)
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_index('idx_notes_user_title', table_name='notes')
-    op.drop_index('idx_notes_user_created', table_name='notes')
-    op.drop_index('idx_notes_user_active', table_name='notes')
-    # ### end Alembic commands ###
+    drop_index_concurrently('idx_notes_user_title', 'notes')
+    drop_index_concurrently('idx_notes_user_created', 'notes')
+    drop_index_concurrently('idx_notes_user_active', 'notes')
@@ -0,0 +1,31 @@
+"""added user_id, id index to notes
+
+Revision ID: 7c0d3a9e5f61
+Revises: 5e2b9d7f4a18
+Create Date: 2026-10-19 19:12:50.336471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c0d3a9e5f61'
+down_revision: Union[str, Sequence[str], None] = '5e2b9d7f4a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # new ids are UUIDv7 (app-side, see utils/uuid7.py); this serves keyset pages in id order per user
+    create_index_concurrently('idx_notes_user_id', 'notes', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('idx_notes_user_id', 'notes')
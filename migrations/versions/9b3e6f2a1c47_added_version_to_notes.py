@@ -0,0 +1,29 @@
+"""added version to notes
+
+Revision ID: 9b3e6f2a1c47
+Revises: 4f2a9c1d7e10
+Create Date: 2026-10-19 14:31:05.617402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e6f2a1c47'
+down_revision: Union[str, Sequence[str], None] = '4f2a9c1d7e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a constant default is stored in the catalog (PostgreSQL 11+), so this does not rewrite notes
+    op.add_column('notes', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notes', 'version')
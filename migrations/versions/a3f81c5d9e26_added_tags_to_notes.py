@@ -0,0 +1,44 @@
+"""added tags to notes
+
+Revision ID: a3f81c5d9e26
+Revises: d71c4e8a2b95
+Create Date: 2026-10-19 17:20:11.502337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from online_migrations import create_index_concurrently, drop_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f81c5d9e26'
+down_revision: Union[str, Sequence[str], None] = 'd71c4e8a2b95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gin lets one GIN index cover user_id equality and the tags @> / && operators together
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    # IF NOT EXISTS: the concurrent build below commits these first, so a rerun after a failed build must skip them
+    op.execute("ALTER TABLE notes ADD COLUMN IF NOT EXISTS tags text[] DEFAULT '{}' NOT NULL")
+    op.execute(
+        'CREATE TABLE IF NOT EXISTS note_tag_counts ('
+        'user_id uuid NOT NULL REFERENCES users (id) ON DELETE CASCADE, '
+        'tag varchar(50) NOT NULL, '
+        'count integer NOT NULL, '
+        'PRIMARY KEY (user_id, tag))'
+    )
+    # last: CONCURRENTLY commits the statements above and builds outside a transaction
+    create_index_concurrently('idx_notes_user_tags', 'notes', ['user_id', 'tags'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TABLE IF EXISTS note_tag_counts')
+    drop_index_concurrently('idx_notes_user_tags', 'notes')
+    op.drop_column('notes', 'tags')
@@ -0,0 +1,42 @@
+"""added note archive revisions table
+
+Revision ID: b92e4d7a1c38
+Revises: e48a6c2f9d03
+Create Date: 2026-10-20 10:12:44.318905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b92e4d7a1c38'
+down_revision: Union[str, Sequence[str], None] = 'e48a6c2f9d03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('note_archive_revisions',
+    sa.Column('note_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('is_snapshot', sa.Boolean(), nullable=False),
+    sa.Column('base_version', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('content_length', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['note_id'], ['note_archive.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('note_id', 'version')
+    )
+    # revision data is zlib-compressed already
+    op.execute('ALTER TABLE note_archive_revisions ALTER COLUMN data SET STORAGE EXTERNAL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('note_archive_revisions')